@@ -13,6 +13,48 @@ class Settings(BaseSettings):
     CORS_ORIGINS: Union[List[str], str] = ["http://localhost:3000", "http://localhost:5173"]
     GEMINI_API_KEY: str = ""
     USE_GEMINI: bool = True
+    GEMINI_BATCH_ENHANCE: bool = True  # Pack several articles into one enhancement request
+    GEMINI_BATCH_TOKEN_BUDGET: int = 8000  # Approximate prompt tokens per batched request
+    GEMINI_BATCH_MAX_ARTICLES: int = 8
+    GEMINI_MAX_CONCURRENCY: int = 10  # In-flight enhancement requests per process (all jobs)
+    GEMINI_REQUESTS_PER_MINUTE: float = 60  # Shared token-bucket rate (0 = unlimited)
+    GEMINI_MAX_RETRIES: int = 5  # Retries of a request rejected with 429
+    GEMINI_BACKOFF_BASE: float = 1.0  # Seconds; doubled per retry, with jitter
+    GEMINI_BACKOFF_MAX: float = 60.0
+    GEMINI_ASYNC: bool = True  # Await the SDK's async client instead of one thread per request
+    ENHANCEMENT_CACHE: bool = True  # Reuse AI results for identical article text (Mongo-backed)
+    ENHANCEMENT_CACHE_MAX_ENTRIES: int = 200000  # Least recently used entries are evicted past this
+    MAX_RENDERED_PAGES: int = 32  # Pages rendered ahead of ingest (crops not yet stored), per process
+    LAYOUT_SEGMENTATION: str = "xycut"  # "xycut" (column-aware) or "headlines" (full-width bands)
+    LAYOUT_MIN_COLUMN_GAP: float = 6.0  # Points of empty x-projection that separate columns
+    LAYOUT_PADDING: float = 4.0  # Points added around each article's text for its crop
+    PIPELINE_EXECUTOR: str = "process"  # "process" or "thread" pool for PDF stages (thread: one PDF thread)
+    PIPELINE_WORKERS: int = 4
+    PIPELINE_PAGES_PER_TASK: int = 4  # Pages per PDF page range (capped at MAX_RENDERED_PAGES)
+    SPACY_BATCH_SIZE: int = 64  # Articles per nlp.pipe batch for no-AI keyword extraction
+    SPACY_N_PROCESS: int = 1  # nlp.pipe worker processes (1 = in-process)
+    USE_JOB_QUEUE: bool = False  # Enqueue uploads for worker.py instead of processing in the API
+    WORKER_CONCURRENCY: int = 2  # Jobs processed at once per worker process
+    WORKER_POLL_INTERVAL: float = 2.0
+    JOB_LEASE_SECONDS: int = 120
+    JOB_MAX_ATTEMPTS: int = 3
+    ARTICLE_BATCH_SIZE: int = 100  # Articles per bulk write when storing a job
+    RESULT_PAGE_SIZE: int = 200  # Default articles per /api/result page
+    RESULT_MAX_PAGE_SIZE: int = 1000
+    CROP_STORE: str = "local"  # "local" (content-addressed directory) or "gridfs"
+    CROP_STORE_DIR: str = "./crops"
+    CROP_IMAGE_FORMAT: str = "JPEG"  # "JPEG" or "WEBP"
+    VECTOR_INDEX_IVF_THRESHOLD: int = 100000  # Switch from exact to IVF search at this size
+    VECTOR_INDEX_NPROBE: int = 8  # IVF clusters scored per query
+    VECTOR_INDEX_SYNC_INTERVAL: float = 10.0  # Seconds between pulls of new embeddings
+    RELATED_ACROSS_JOBS: bool = True  # Link related articles across the whole corpus, not just one job
+    RELATED_TOP_N: int = 5
+    BM25_INDEX_PATH: str = "./search_index/bm25.pkl"  # Snapshot of the lexical search index
+    BM25_SAVE_EVERY: int = 1000  # Newly indexed articles before the snapshot is rewritten
+    SEARCH_RRF_K: int = 60  # Reciprocal-rank fusion constant for hybrid search
+    QUERY_CACHE_SIZE: int = 1024  # Cached query embeddings / result lists per process
+    QUERY_CACHE_TTL: float = 3600.0  # Seconds
+    WARMUP_MODE: str = "background"  # "eager", "background" or "lazy" model/client initialization
 
     @field_validator('CORS_ORIGINS', mode='before')
     @classmethod
@@ -1,9 +1,13 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.models.database import connect_to_mongo, close_mongo_connection
 from app.routes import api
+from app.services.pipeline_executor import pipeline_executor
+from app.services.bm25_index import bm25_index
+from app.services.warmup import warm_up, mark_ready_without_warmup
 from app.config import settings
 
 
@@ -11,8 +15,23 @@ from app.config import settings
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+
+    # Models, Gemini and the search index are initialized according to WARMUP_MODE:
+    # "eager" before serving, "background" while serving, "lazy" on first use
+    warmup_task = None
+    if settings.WARMUP_MODE == "eager":
+        await warm_up()
+    elif settings.WARMUP_MODE == "background":
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        mark_ready_without_warmup()
+
     yield
     # Shutdown
+    if warmup_task:
+        warmup_task.cancel()
+    pipeline_executor.shutdown()
+    await bm25_index.maybe_save(force=True)
     await close_mongo_connection()
 
 
@@ -46,6 +65,7 @@ async def root():
             "status": "/api/status/{job_id}",
             "result": "/api/result/{job_id}",
             "search": "/api/search",
-            "health": "/api/health"
+            "health": "/api/health",
+            "ready": "/api/ready"
         }
     }
@@ -15,7 +15,14 @@ async def connect_to_mongo():
     # Create indexes
     await database.articles.create_index("article_id", unique=True)
     await database.articles.create_index("keywords")
+    await database.articles.create_index("keywords_normalized")
+    await database.articles.create_index("embedded_at")
+    await database.articles.create_index("crop_image_id")
+    await database.keyword_vocabulary.create_index([("prefix", 1), ("length", 1), ("_id", 1)])
+    await database.articles.create_index([("job_id", 1), ("seq", 1)])
     await database.jobs.create_index("job_id", unique=True)
+    await database.jobs.create_index([("status", 1), ("created_at", 1)])
+    await database.enhancement_cache.create_index("last_used_at")
 
     print(f"Connected to MongoDB: {settings.DATABASE_NAME}")
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional, Dict
 from datetime import datetime
 
 
@@ -11,8 +11,9 @@ class Article(BaseModel):
     summary: str = ""  # AI-generated summary
     keywords: List[str] = []
     hashtags: List[str] = []
-    crop_image_base64: str = ""
+    crop_image_url: str = ""
     related_articles: List[str] = []
+    related_scores: List[float] = []  # Cosine similarity of each related article
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -24,8 +25,11 @@ class KeywordSummary(BaseModel):
 class ProcessResult(BaseModel):
     job_id: str
     pages: int
-    articles: List[Article]
+    article_count: Optional[int] = None
+    articles: List[Article]  # One page; only the requested `fields` when projected
     keywords_summary: List[KeywordSummary]
+    enhancement_cache: Optional[Dict] = None  # Per-job AI cache hits/misses
+    next_cursor: Optional[str] = None  # Pass as `cursor` to get the next page
 
 
 class Job(BaseModel):
@@ -54,13 +58,26 @@ class ProcessResponse(BaseModel):
 class SearchRequest(BaseModel):
     query: str
     limit: int = 10
-
-
-class SearchResult(BaseModel):
+    # hybrid: BM25 and vector results fused by reciprocal rank; lexical / semantic: one retriever only
+    mode: Literal["hybrid", "lexical", "semantic"] = "hybrid"
+    # Optional filters (inclusive ranges); date is when the article was stored
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    job_id: Optional[str] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+    keyword: Optional[str] = None
+
+
+class ArticleSummary(BaseModel):
+    """Compact list entry; fetch /api/articles/{article_id} for the full article"""
     article_id: str
+    page: int
     title: str
     snippet: str
-    keywords: List[str]
-    crop_image_base64: str
-    page: int
+    keywords: List[str] = []
+    crop_image_url: str = ""
+
+
+class SearchResult(ArticleSummary):
     relevance_score: float
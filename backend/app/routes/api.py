@@ -1,7 +1,12 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, List, Optional, Set
+import asyncio
 import uuid
 import os
+import base64
+import hashlib
+import json
 from datetime import datetime
 
 from app.models.schemas import (
@@ -10,16 +15,33 @@ from app.models.schemas import (
     ProcessResult,
     SearchRequest,
     SearchResult,
-    Article
+    Article,
+    ArticleSummary
 )
 from app.models.database import get_database
 from app.services.job_processor import process_pdf_background
-from app.services.nlp_processor import NLPProcessor
+from app.services.job_queue import job_queue
+from app.services.crop_store import crop_store, crop_image_url, crop_content_type, etag_matches
+from app.services.pipeline_executor import pipeline_executor
+from app.services.vector_index import vector_index
+from app.services.bm25_index import bm25_index, reciprocal_rank_fusion
+from app.services.search_filters import active_filters, mongo_filter
+from app.services.query_cache import (
+    normalize_query,
+    query_embedding_cache,
+    search_result_cache
+)
+from app.services.nlp_processor import NLPProcessor, SNIPPET_SOURCE_CHARS
+from app.services.keyword_search import keyword_filter
+from app.services.model_registry import model_registry
+from app.services.enhancement_scheduler import enhancement_scheduler
+from app.services.enhancement_cache import enhancement_cache
+from app.services.warmup import warmup_state
 from app.config import settings
 
 router = APIRouter()
 
-# Initialize NLP processor for search
+# NLP processor for search (models are shared through the model registry)
 nlp_processor = NLPProcessor()
 
 
@@ -53,20 +75,11 @@ async def process_pdf(
         f.write(contents)
 
     # Create job record
-    db = get_database()
-    await db.jobs.insert_one({
-        "job_id": job_id,
-        "status": "pending",
-        "step": "Initializing...",
-        "progress": 0,
-        "result": None,
-        "error": None,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    })
+    await job_queue.enqueue(job_id, file_path, claimable=settings.USE_JOB_QUEUE)
 
-    # Start background processing
-    background_tasks.add_task(process_pdf_background, job_id, file_path)
+    # Start background processing unless a worker process will claim the job
+    if not settings.USE_JOB_QUEUE:
+        background_tasks.add_task(process_pdf_background, job_id, file_path)
 
     return ProcessResponse(job_id=job_id, message="Processing started")
 
@@ -90,11 +103,96 @@ async def get_job_status(job_id: str):
     )
 
 
-@router.get("/result/{job_id}", response_model=ProcessResult)
-async def get_job_result(job_id: str):
-    """
-    Get the final result of a completed job
-    """
+def article_from_doc(art: Dict) -> Article:
+    """Build the API Article from a stored article document (missing fields get defaults)"""
+    return Article(
+        article_id=art["article_id"],
+        page=art.get("page", 0),
+        title=art.get("title", ""),
+        content=art.get("content", ""),
+        summary=art.get("summary", ""),
+        keywords=art.get("keywords", []),
+        hashtags=art.get("hashtags", []),
+        crop_image_url=crop_image_url(art),
+        related_articles=art.get("related_articles", []),
+        related_scores=art.get("related_scores", []),
+        created_at=art.get("created_at", datetime.utcnow())
+    )
+
+
+# Stored fields needed to render each API field (crop_image_url is derived)
+ARTICLE_SOURCE_FIELDS = {
+    "crop_image_url": ["crop_image_id", "crop_image_format", "crop_image_base64"]
+}
+
+
+# Only what a list entry shows: no full content, embedding or inline crop bytes
+ARTICLE_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "article_id": 1,
+    "page": 1,
+    "title": 1,
+    "keywords": 1,
+    "snippet": 1,
+    "crop_image_id": 1,
+    # Articles stored before snippets were precomputed: just the head of the content
+    "content": {"$cond": [
+        {"$ifNull": ["$snippet", False]},
+        "$$REMOVE",
+        {"$substrCP": [{"$ifNull": ["$content", ""]}, 0, SNIPPET_SOURCE_CHARS]}
+    ]},
+    # Legacy inline crops: whether one exists, without loading the base64 image
+    "crop_image_base64": {"$cond": [
+        {"$gt": [{"$strLenCP": {"$ifNull": ["$crop_image_base64", ""]}}, 0]},
+        True,
+        "$$REMOVE"
+    ]}
+}
+
+
+def article_summary_from_doc(art: Dict) -> ArticleSummary:
+    """Build a compact list entry from a document loaded with ARTICLE_SUMMARY_PROJECTION"""
+    return ArticleSummary(
+        article_id=art["article_id"],
+        page=art.get("page", 0),
+        title=art.get("title", ""),
+        snippet=art.get("snippet") or nlp_processor.extract_snippet(art.get("content", "")),
+        keywords=art.get("keywords", []),
+        crop_image_url=crop_image_url(art)
+    )
+
+
+def parse_article_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Validate a comma-separated `fields` parameter (None = every field)"""
+    if not fields:
+        return None
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(Article.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown article fields: {', '.join(sorted(unknown))}")
+    return requested | {"article_id"}
+
+
+def article_projection(fields: Optional[Set[str]]) -> Dict:
+    """Mongo projection that loads only what the requested fields need"""
+    if fields is None:
+        return {"_id": 0, "embedding": 0}
+
+    projection = {"_id": 0, "article_id": 1, "seq": 1}
+    for field in fields:
+        for source in ARTICLE_SOURCE_FIELDS.get(field, [field]):
+            projection[source] = 1
+    return projection
+
+
+def article_payload(art: Dict, fields: Optional[Set[str]]) -> Dict:
+    """JSON-ready article restricted to the requested fields"""
+    return article_from_doc(art).model_dump(mode="json", include=fields)
+
+
+async def get_completed_job(job_id: str) -> Dict:
+    """Load a job, raising the matching HTTP error unless it completed with a result"""
     db = get_database()
     job = await db.jobs.find_one({"job_id": job_id})
 
@@ -113,35 +211,102 @@ async def get_job_result(job_id: str):
     if not job.get("result"):
         raise HTTPException(status_code=500, detail="No result available")
 
-    # Fetch articles from articles collection (avoids MongoDB size limit)
-    articles_cursor = db.articles.find({"job_id": job_id})
-    articles = await articles_cursor.to_list(length=1000)
-
-    # Convert MongoDB documents to Article objects
-    article_list = [
-        Article(
-            article_id=art["article_id"],
-            page=art["page"],
-            title=art["title"],
-            content=art["content"],
-            keywords=art.get("keywords", []),
-            hashtags=art.get("hashtags", []),
-            crop_image_base64=art.get("crop_image_base64", ""),
-            related_articles=art.get("related_articles", []),
-            created_at=art.get("created_at", datetime.utcnow())
-        )
-        for art in articles
-    ]
+    return job
 
-    # Build result from job summary and fetched articles
-    result = ProcessResult(
-        job_id=job_id,
-        pages=job["result"].get("pages", 0),
-        articles=article_list,
-        keywords_summary=job["result"].get("keywords_summary", [])
-    )
 
-    return result
+def legacy_article_seq(article_id: str) -> int:
+    """Position of an article stored before `seq` existed (its article_id suffix, 0 if none)"""
+    suffix = article_id.rsplit("_", 1)[-1]
+    return int(suffix) if suffix.isdigit() else 0
+
+
+async def legacy_articles(job_id: str, after: int, projection: Dict) -> List[Dict]:
+    """
+    Articles of a job stored before `seq` existed, ordered in memory (read-only).
+    `python backfill_article_seq.py` numbers them so the `seq` index serves these jobs too
+    """
+    db = get_database()
+    articles = []
+    async for art in db.articles.find({"job_id": job_id}, projection):
+        art["seq"] = art.get("seq") or legacy_article_seq(art["article_id"])
+        if art["seq"] > after:
+            articles.append(art)
+    articles.sort(key=lambda art: art["seq"])
+    return articles
+
+
+def parse_cursor(cursor: Optional[str]) -> int:
+    """Cursors are the `seq` of the last article already returned"""
+    if not cursor:
+        return 0
+    if not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return int(cursor)
+
+
+@router.get("/result/{job_id}", response_model=ProcessResult)
+async def get_job_result(
+    job_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.RESULT_PAGE_SIZE, ge=1, le=settings.RESULT_MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    format: str = Query(default="json", pattern="^(json|ndjson)$")
+):
+    """
+    Get the final result of a completed job, one page of articles at a time
+    - cursor: `next_cursor` of the previous page (omit for the first page)
+    - fields: comma-separated article fields to return, e.g. title,keywords,page
+    - format=ndjson: stream the summary line, then every remaining article, one JSON object per line
+    """
+    job = await get_completed_job(job_id)
+    selected = parse_article_fields(fields)
+    after = parse_cursor(cursor)
+
+    db = get_database()
+    query = {"job_id": job_id, "seq": {"$gt": after}}
+    projection = article_projection(selected)
+    legacy = not job["result"].get("article_seq")
+
+    summary = {
+        "job_id": job_id,
+        "pages": job["result"].get("pages", 0),
+        "article_count": job["result"].get("article_count"),
+        "keywords_summary": job["result"].get("keywords_summary", []),
+        "enhancement_cache": job["result"].get("enhancement_cache")
+    }
+
+    if format == "ndjson":
+        async def stream():
+            yield json.dumps(summary) + "\n"
+            if legacy:
+                for art in await legacy_articles(job_id, after, projection):
+                    yield json.dumps(article_payload(art, selected)) + "\n"
+                return
+
+            articles_cursor = db.articles.find(query, projection).sort("seq", 1).batch_size(settings.RESULT_PAGE_SIZE)
+            async for art in articles_cursor:
+                yield json.dumps(article_payload(art, selected)) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    # Fetch one page from the articles collection (avoids MongoDB size limit)
+    if legacy:
+        articles = (await legacy_articles(job_id, after, projection))[:limit + 1]
+    else:
+        articles_cursor = db.articles.find(query, projection).sort("seq", 1).limit(limit + 1)
+        articles = await articles_cursor.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(articles) > limit:
+        articles = articles[:limit]
+        next_cursor = str(articles[-1]["seq"])
+
+    # Only the requested fields are serialized, so bypass response_model filtering
+    return JSONResponse({
+        **summary,
+        "articles": [article_payload(art, selected) for art in articles],
+        "next_cursor": next_cursor
+    })
 
 
 @router.post("/search", response_model=List[SearchResult])
@@ -149,38 +314,98 @@ async def search_articles(search_request: SearchRequest):
     """
     Search for articles by keyword/query
     Returns relevant articles with snippets and images
+    relevance_score is the fused rank score in hybrid mode, BM25 in lexical, cosine in semantic
+    Filters are applied before ranking: both indexes only score articles passing them
     """
     db = get_database()
+    mode = search_request.mode
+    limit = search_request.limit
+
+    # Pick up articles stored by other processes since the last search
+    await asyncio.gather(vector_index.sync(), bm25_index.sync())
+
+    # Repeated queries against unchanged indexes are served from cache
+    query = normalize_query(search_request.query)
+    filters = active_filters(search_request)
+    cache_key = (query, limit, mode, tuple(sorted(filters.items())))
+    search_result_cache.check_version((vector_index.version, bm25_index.version))
+    cached = search_result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Page, job and date filters become row bitmaps inside the indexes; the
+    # keyword filter is resolved by Mongo (keywords_normalized index) to candidate ids
+    query_filter = await mongo_filter(db, filters) if filters else {}
+    allowed_ids = None
+    if "keyword" in filters:
+        allowed_ids = [
+            doc["article_id"]
+            async for doc in db.articles.find(query_filter, {"_id": 0, "article_id": 1})
+        ]
+        if not allowed_ids:
+            search_result_cache.put(cache_key, [])
+            return []
+
+    # Fused rankings look deeper into each retriever than the page they fill
+    depth = limit if mode != "hybrid" else max(limit * 4, 50)
+
+    async def semantic_hits():
+        if mode == "lexical":
+            return []
+
+        # Embed the query (cached per normalized query) and look it up in the vector index
+        query_embedding = query_embedding_cache.get(query)
+        if query_embedding is None:
+            query_embedding = (await pipeline_executor.run_threaded(
+                nlp_processor.encode_texts, [query]
+            ))[0]
+            query_embedding_cache.put(query, query_embedding)
+
+        return await pipeline_executor.run_threaded(
+            vector_index.search, query_embedding, depth,
+            min_score=0.1, filters=filters, allowed_ids=allowed_ids
+        )
 
-    # Get all articles
-    articles_cursor = db.articles.find({})
-    articles = await articles_cursor.to_list(length=1000)
+    async def lexical_hits():
+        if mode == "semantic":
+            return []
+        return await pipeline_executor.run_threaded(
+            bm25_index.search, query, depth, filters=filters, allowed_ids=allowed_ids
+        )
 
-    if not articles:
+    # Both retrievers run at the same time
+    semantic, lexical = await asyncio.gather(semantic_hits(), lexical_hits())
+    if mode == "hybrid":
+        hits = reciprocal_rank_fusion(
+            [[article_id for article_id, _ in semantic], [article_id for article_id, _ in lexical]],
+            k=settings.SEARCH_RRF_K
+        )[:limit]
+    else:
+        hits = semantic or lexical
+
+    if not hits:
+        search_result_cache.put(cache_key, [])
         return []
 
-    # Perform semantic search
-    results = nlp_processor.search_articles(
-        search_request.query,
-        articles,
-        limit=search_request.limit
+    # Fetch only the matching articles, and only the fields a result shows; the
+    # filter is re-applied so an index with stale metadata cannot leak other articles
+    articles_cursor = db.articles.find(
+        {"article_id": {"$in": [article_id for article_id, _ in hits]}, **query_filter},
+        ARTICLE_SUMMARY_PROJECTION
     )
+    articles_by_id = {art["article_id"]: art async for art in articles_cursor}
 
     # Format results
-    search_results = []
-    for article, score in results:
-        snippet = nlp_processor.extract_snippet(article["content"])
-
-        search_results.append(SearchResult(
-            article_id=article["article_id"],
-            title=article["title"],
-            snippet=snippet,
-            keywords=article.get("keywords", []),
-            crop_image_base64=article.get("crop_image_base64", ""),
-            page=article["page"],
+    search_results = [
+        SearchResult(
+            **article_summary_from_doc(articles_by_id[article_id]).model_dump(),
             relevance_score=score
-        ))
+        )
+        for article_id, score in hits
+        if article_id in articles_by_id
+    ]
 
+    search_result_cache.put(cache_key, search_results)
     return search_results
 
 
@@ -195,50 +420,98 @@ async def get_article(article_id: str):
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    return Article(
-        article_id=article["article_id"],
-        page=article["page"],
-        title=article["title"],
-        content=article["content"],
-        keywords=article.get("keywords", []),
-        hashtags=article.get("hashtags", []),
-        crop_image_base64=article.get("crop_image_base64", ""),
-        related_articles=article.get("related_articles", []),
-        created_at=article.get("created_at", datetime.utcnow())
+    return article_from_doc(article)
+
+
+@router.get("/articles/{article_id}/image")
+async def get_article_image(article_id: str, request: Request):
+    """
+    Get the cropped newspaper image of an article
+    Served with an ETag (content hash) so clients can revalidate cheaply
+    """
+    db = get_database()
+    article = await db.articles.find_one(
+        {"article_id": article_id},
+        {"crop_image_id": 1, "crop_image_format": 1, "crop_image_base64": 1}
     )
 
+    if not article:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    image_id = article.get("crop_image_id")
+    data = None
+
+    if not image_id and article.get("crop_image_base64"):
+        # Articles stored before the crop store kept the image inline: same content-hash ETag
+        data = base64.b64decode(article["crop_image_base64"])
+        image_id = hashlib.sha256(data).hexdigest()
+
+    if not image_id:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {
+        "ETag": f'"{image_id}"',
+        "Cache-Control": "public, max-age=86400"
+    }
+    if etag_matches(request.headers.get("if-none-match"), image_id):
+        return Response(status_code=304, headers=headers)
+
+    if data is None:
+        data = await crop_store.get(image_id)
+    if not data:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    return Response(content=data, media_type=crop_content_type(article), headers=headers)
 
-@router.get("/keywords/{keyword}/articles", response_model=List[Article])
-async def get_articles_by_keyword(keyword: str, limit: int = 20):
+
+@router.get("/keywords/{keyword}/articles", response_model=List[ArticleSummary])
+async def get_articles_by_keyword(
+    keyword: str,
+    limit: int = 20,
+    mode: str = Query(default="exact", pattern="^(exact|prefix|fuzzy)$")
+):
     """
     Get all articles containing a specific keyword
+    Matching ignores case and accents; mode is exact, prefix or fuzzy (typo-tolerant)
+    Returns compact summaries; fetch /api/articles/{article_id} for details
     """
     db = get_database()
 
-    # Find articles with this keyword
+    # Find articles with this keyword (served by the keywords_normalized index)
     articles_cursor = db.articles.find(
-        {"keywords": {"$regex": keyword, "$options": "i"}}
+        await keyword_filter(db, keyword, mode),
+        ARTICLE_SUMMARY_PROJECTION
     ).limit(limit)
 
     articles = await articles_cursor.to_list(length=limit)
 
-    return [
-        Article(
-            article_id=art["article_id"],
-            page=art["page"],
-            title=art["title"],
-            content=art["content"],
-            keywords=art.get("keywords", []),
-            hashtags=art.get("hashtags", []),
-            crop_image_base64=art.get("crop_image_base64", ""),
-            related_articles=art.get("related_articles", []),
-            created_at=art.get("created_at", datetime.utcnow())
-        )
-        for art in articles
-    ]
+    return [article_summary_from_doc(art) for art in articles]
+
+
+@router.get("/metrics")
+async def metrics():
+    """Search index, cache and model load counters for this process"""
+    return {
+        "vector_index": {"size": len(vector_index), "version": vector_index.version},
+        "bm25_index": {"size": len(bm25_index), "version": bm25_index.version},
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "search_result_cache": search_result_cache.stats(),
+        "models": model_registry.stats(),
+        "enhancement_scheduler": enhancement_scheduler.stats(),
+        "enhancement_cache": enhancement_cache.stats()
+    }
 
 
 @router.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: the server is accepting requests)"""
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until start-up warm-up has finished"""
+    status = warmup_state.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
@@ -0,0 +1,393 @@
+import asyncio
+import copy
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.database import get_database
+from app.services.keyword_search import normalize_keyword
+from app.services.search_filters import ArticleMetadata
+from app.services.vector_index import SYNC_OVERLAP
+from app.config import settings
+
+SNAPSHOT_FORMAT = 3
+# Share of tombstoned rows at which save() compacts the index
+COMPACT_RATIO = 0.1
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOP_WORDS = frozenset("""
+a an and are as at be been but by for from has have he her his in is it its of on or
+said she that the their they this to was were which will with would you
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent- and case-folded word tokens without stop words"""
+    return [
+        token for token in TOKEN_PATTERN.findall(normalize_keyword(text))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def article_terms(article: Dict) -> List[str]:
+    """Tokens of an article; the title counts twice, keywords once, then the content"""
+    title = article.get("title", "")
+    return tokenize(" ".join([title, title, " ".join(article.get("keywords", [])), article.get("content", "")]))
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over article title, keywords and content.
+
+    Postings are compact per-term arrays of (row, term frequency) that only
+    grow: articles are added at ingest or pulled from Mongo by sync(), and a
+    re-indexed article tombstones its old row. Tombstoned rows count in no
+    statistic and are dropped when the index is saved to its snapshot file
+    (once they reach COMPACT_RATIO of the rows), so a restart only re-reads
+    articles stored since then.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75, save_every: int = 1000, sync_interval: float = 10.0):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.save_every = save_every
+        self.sync_interval = sync_interval
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array("f")
+        self._stamps = array("d")  # embedded_at of the indexed copy, as a timestamp
+        self._deleted = array("b")
+        self._metadata = ArticleMetadata()
+        self._live = 0
+        self._total_length = 0.0
+
+        self._watermark = None
+        self._last_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+        self._loaded = False
+        self._unsaved = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def loaded(self) -> bool:
+        """Whether this process serves searches (restored the snapshot and syncs)"""
+        return self._loaded
+
+    def add(self, articles: Sequence[Dict], stamps: Sequence[float]):
+        """Index articles ({article_id, title, keywords, content, page, job_id, created_at}); older copies are skipped"""
+        added = 0
+        for article, stamp in zip(articles, stamps):
+            # Already indexed at ingest (or by an earlier, overlapping sync); under
+            # the lock since save() may swap in renumbered rows
+            with self._lock:
+                old_row = self._rows.get(article["article_id"])
+                if old_row is not None and self._stamps[old_row] >= stamp:
+                    continue
+
+            terms = article_terms(article)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+
+            with self._lock:
+                old_row = self._rows.get(article["article_id"])
+                if old_row is not None:
+                    if self._stamps[old_row] >= stamp:
+                        continue
+                    self._remove_row(old_row)
+
+                row = len(self._ids)
+                self._ids.append(article["article_id"])
+                self._rows[article["article_id"]] = row
+                self._lengths.append(len(terms))
+                self._stamps.append(stamp)
+                self._deleted.append(0)
+                self._metadata.set(row, article)
+                self._live += 1
+                self._total_length += len(terms)
+
+                for term, count in counts.items():
+                    posting = self._postings.get(term)
+                    if posting is None:
+                        posting = self._postings[term] = (array("i"), array("f"))
+                    posting[0].append(row)
+                    posting[1].append(count)
+                added += 1
+
+        if added:
+            with self._lock:
+                self.version += 1
+                self._unsaved += added
+
+    def _remove_row(self, row: int):
+        self._deleted[row] = 1
+        self._live -= 1
+        self._total_length -= self._lengths[row]
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        filters: Optional[Dict] = None,
+        allowed_ids: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to k (article_id, BM25 score) pairs, best first.
+        With `filters` (SearchRequest filter fields) or `allowed_ids`, postings
+        are cut down to the rows passing both before they are scored.
+        """
+        terms = set(tokenize(query))
+
+        with self._lock:
+            if not terms or self._live == 0 or k <= 0:
+                return []
+
+            mask = None
+            if filters or allowed_ids is not None:
+                allowed_rows = None
+                if allowed_ids is not None:
+                    allowed_rows = [self._rows[article_id] for article_id in allowed_ids if article_id in self._rows]
+                mask = self._metadata.filter_mask(len(self._ids), filters or {}, allowed_rows)
+                if not mask.any():
+                    return []
+
+            # Copies, not views: a live view would stop add() from growing the arrays
+            lengths = np.array(self._lengths, dtype=np.float32)
+            deleted = np.array(self._deleted, dtype=bool)
+            average_length = max(self._total_length / self._live, 1.0)
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+
+                rows = np.array(posting[0], dtype=np.int32)
+                frequencies = np.array(posting[1], dtype=np.float32)
+                # Corpus-wide document frequency of live rows, so filtering does not change the term weights
+                df = len(rows) - int(np.count_nonzero(deleted[rows]))
+                if df == 0:
+                    continue
+                idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+                if mask is not None:
+                    keep = mask[rows]
+                    rows, frequencies = rows[keep], frequencies[keep]
+                norm = self.k1 * (1 - self.b + self.b * lengths[rows] / average_length)
+                scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+            scores[deleted] = 0
+            matched = np.flatnonzero(scores)
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            matched = matched[np.argsort(-scores[matched])]
+
+            return [(self._ids[row], float(scores[row])) for row in matched]
+
+    async def sync(self, force: bool = False):
+        """Index articles stored since the last sync (throttled by sync_interval)"""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        async with self._sync_lock:
+            if not self._loaded:
+                # Start from the snapshot so only newer articles are read from Mongo
+                await asyncio.to_thread(self.load)
+                self._loaded = True
+
+            db = get_database()
+            query = {"embedded_at": {"$exists": True}}
+            if self._watermark is not None:
+                query["embedded_at"] = {"$gte": self._watermark - SYNC_OVERLAP}
+
+            cursor = db.articles.find(
+                query,
+                {
+                    "_id": 0, "article_id": 1, "title": 1, "keywords": 1, "content": 1, "embedded_at": 1,
+                    "page": 1, "job_id": 1, "created_at": 1
+                }
+            ).sort("embedded_at", 1)
+
+            batch = []
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= 1000:
+                    await self._add_synced(batch)
+                    batch = []
+
+            if batch:
+                await self._add_synced(batch)
+
+        await self.maybe_save()
+
+    async def _add_synced(self, docs: List[Dict]):
+        # Tokenizing is CPU-bound: keep it off the event loop
+        await asyncio.to_thread(self.add, docs, [doc["embedded_at"].timestamp() for doc in docs])
+        self._watermark = docs[-1]["embedded_at"]
+
+    def load(self) -> bool:
+        """Restore the snapshot written by save(); returns whether one was loaded"""
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            print(f"❌ Could not load BM25 index snapshot: {e}")
+            return False
+
+        if snapshot.get("format") != SNAPSHOT_FORMAT:
+            return False
+
+        postings = _postings_from_flat(snapshot)
+
+        with self._lock:
+            self._postings = postings
+            for name in ("ids", "lengths", "stamps", "deleted", "metadata", "live", "total_length", "watermark"):
+                setattr(self, f"_{name}", snapshot[name])
+            self._rows = {article_id: row for row, article_id in enumerate(self._ids) if not self._deleted[row]}
+            self._unsaved = 0
+            self.version += 1
+
+        print(f"✓ Loaded BM25 index snapshot ({self._live} articles)")
+        return True
+
+    def save(self):
+        """
+        Write a snapshot atomically (temporary file, then rename). Once
+        tombstoned rows reach COMPACT_RATIO of all rows they are dropped.
+        """
+        # Only copying happens under the lock: postings as a few flat arrays,
+        # which also pickle as plain memory copies (one object per term would
+        # hold the GIL for the whole dump)
+        with self._lock:
+            state = {
+                "format": SNAPSHOT_FORMAT,
+                "ids": list(self._ids),
+                **_flat_postings(self._postings),
+                "lengths": self._lengths[:],
+                "stamps": self._stamps[:],
+                "deleted": self._deleted[:],
+                "metadata": copy.deepcopy(self._metadata),
+                "live": self._live,
+                "total_length": self._total_length,
+                "watermark": self._watermark,
+            }
+            version = self.version
+            self._unsaved = 0
+
+        compacted = len(state["ids"]) - state["live"] >= COMPACT_RATIO * max(len(state["ids"]), 1)
+        if compacted:
+            state = _compact(state)
+
+        snapshot = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+
+        if compacted:
+            # Built outside the lock; swapped in only if no article was indexed
+            # meanwhile (otherwise a later save compacts)
+            postings = _postings_from_flat(state)
+            rows = {article_id: row for row, article_id in enumerate(state["ids"])}
+            with self._lock:
+                if self.version == version:
+                    self._postings, self._rows = postings, rows
+                    for name in ("ids", "lengths", "stamps", "deleted", "metadata"):
+                        setattr(self, f"_{name}", state[name])
+
+    async def maybe_save(self, force: bool = False):
+        """Persist once enough articles were added since the last snapshot"""
+        # A process that never loaded the snapshot (e.g. the ingest worker) must not overwrite it
+        if self._loaded and self._unsaved and (force or self._unsaved >= self.save_every):
+            await asyncio.to_thread(self.save)
+
+
+def _to_array(typecode: str, values: np.ndarray) -> array:
+    compact = array(typecode)
+    compact.frombytes(np.ascontiguousarray(values, dtype=np.dtype(typecode)).tobytes())
+    return compact
+
+
+def _flat_postings(postings: Dict[str, Tuple[array, array]]) -> Dict:
+    """Postings as flat arrays: terms, rows per term, then every row and every frequency"""
+    return {
+        "terms": list(postings),
+        "posting_counts": np.fromiter((len(rows) for rows, _ in postings.values()), dtype=np.int64, count=len(postings)),
+        "posting_rows": np.frombuffer(b"".join([rows.tobytes() for rows, _ in postings.values()]), dtype=np.int32),
+        "posting_frequencies": np.frombuffer(
+            b"".join([frequencies.tobytes() for _, frequencies in postings.values()]), dtype=np.float32
+        ),
+    }
+
+
+def _postings_from_flat(flat: Dict) -> Dict[str, Tuple[array, array]]:
+    """Per-term posting arrays from _flat_postings() output"""
+    offsets = np.concatenate([[0], np.cumsum(flat["posting_counts"])]).tolist()
+    rows, frequencies = flat["posting_rows"].tobytes(), flat["posting_frequencies"].tobytes()
+    return {
+        term: (array("i", rows[4 * start:4 * end]), array("f", frequencies[4 * start:4 * end]))
+        for term, start, end in zip(flat["terms"], offsets[:-1], offsets[1:])
+        if end > start
+    }
+
+
+def _compact(state: Dict) -> Dict:
+    """A copy of a snapshot state without tombstoned rows; the rest are renumbered"""
+    deleted = np.array(state["deleted"], dtype=bool)
+    keep = np.flatnonzero(~deleted)
+    new_rows = np.full(len(deleted), -1, dtype=np.int32)
+    new_rows[keep] = np.arange(len(keep), dtype=np.int32)
+
+    live = ~deleted[state["posting_rows"]]
+    term_of_posting = np.repeat(np.arange(len(state["terms"])), state["posting_counts"])
+    state["metadata"].take(keep)
+
+    return {
+        **state,
+        "ids": [state["ids"][row] for row in keep],
+        "posting_counts": np.bincount(term_of_posting[live], minlength=len(state["terms"])).astype(np.int64),
+        "posting_rows": new_rows[state["posting_rows"][live]],
+        "posting_frequencies": state["posting_frequencies"][live],
+        "lengths": _to_array("f", np.frombuffer(state["lengths"], dtype=np.float32)[keep]),
+        "stamps": _to_array("d", np.frombuffer(state["stamps"], dtype=np.float64)[keep]),
+        "deleted": array("b", bytes(len(keep))),
+    }
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum of 1 / (k + rank) over the lists it appears in"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, article_id in enumerate(ranking, 1):
+            scores[article_id] = scores.get(article_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# Global BM25 index instance
+bm25_index = BM25Index(
+    path=settings.BM25_INDEX_PATH,
+    save_every=settings.BM25_SAVE_EVERY,
+    sync_interval=settings.VECTOR_INDEX_SYNC_INTERVAL
+)
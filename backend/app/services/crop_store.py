@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import os
+import re
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.database import get_database
+from app.config import settings
+
+CONTENT_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+ENTITY_TAG = re.compile(r'(?:W/)?"([^"]*)"')
+
+
+class LocalCropStore:
+    """Content-addressed crop store on local disk: <dir>/<ab>/<sha256>"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, image_id: str) -> str:
+        return os.path.join(self.directory, image_id[:2], image_id)
+
+    def _write(self, image_id: str, data: bytes):
+        path = self._path(image_id)
+        if os.path.exists(path):
+            # Stored again: refresh its age so cleanup_crops.py keeps it while the new job runs
+            os.utime(path)
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read(self, image_id: str) -> Optional[bytes]:
+        try:
+            with open(self._path(image_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _list(self, stored_before: float) -> List[str]:
+        image_ids = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".tmp") and os.path.getmtime(os.path.join(root, name)) < stored_before:
+                    image_ids.append(name)
+        return image_ids
+
+    def _remove(self, image_id: str):
+        try:
+            os.remove(self._path(image_id))
+        except FileNotFoundError:
+            pass
+
+    async def save(self, image_id: str, data: bytes):
+        await asyncio.to_thread(self._write, image_id, data)
+
+    async def load(self, image_id: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, image_id)
+
+    async def list_ids(self, stored_before: float) -> List[str]:
+        return await asyncio.to_thread(self._list, stored_before)
+
+    async def delete(self, image_id: str):
+        await asyncio.to_thread(self._remove, image_id)
+
+
+class GridFSCropStore:
+    """Content-addressed crop store in MongoDB GridFS (bucket `crops`)"""
+
+    def __init__(self, bucket_name: str = "crops"):
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    def _get_bucket(self):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(get_database(), bucket_name=self.bucket_name)
+        return self._bucket
+
+    async def save(self, image_id: str, data: bytes):
+        db = get_database()
+        # Stored again: refresh its age so cleanup_crops.py keeps it while the new job runs
+        result = await db[f"{self.bucket_name}.files"].update_one(
+            {"filename": image_id}, {"$set": {"metadata.stored_at": datetime.utcnow()}}
+        )
+        if result.matched_count:
+            return
+
+        await self._get_bucket().upload_from_stream(image_id, data, metadata={"stored_at": datetime.utcnow()})
+
+    async def load(self, image_id: str) -> Optional[bytes]:
+        db = get_database()
+        if not await db[f"{self.bucket_name}.files"].find_one({"filename": image_id}, {"_id": 1}):
+            return None
+
+        stream = await self._get_bucket().open_download_stream_by_name(image_id)
+        return await stream.read()
+
+    async def list_ids(self, stored_before: float) -> List[str]:
+        cutoff = datetime.utcfromtimestamp(stored_before)
+        cursor = get_database()[f"{self.bucket_name}.files"].find(
+            {"$or": [
+                {"metadata.stored_at": {"$lt": cutoff}},
+                {"metadata.stored_at": {"$exists": False}, "uploadDate": {"$lt": cutoff}}
+            ]},
+            {"filename": 1}
+        )
+        return [doc["filename"] async for doc in cursor]
+
+    async def delete(self, image_id: str):
+        cursor = get_database()[f"{self.bucket_name}.files"].find({"filename": image_id}, {"_id": 1})
+        async for doc in cursor:
+            await self._get_bucket().delete(doc["_id"])
+
+
+class CropStore:
+    """
+    Stores article crop images as raw bytes outside the article documents.
+    Images are keyed by the SHA-256 of their content, so identical crops are
+    stored once and the key doubles as an ETag. Since a crop may be shared,
+    deleting an article leaves its crop; cleanup_crops.py removes crops no
+    article references.
+    """
+
+    def __init__(self, backend: str = "local", directory: str = "./crops"):
+        if backend == "gridfs":
+            self.backend = GridFSCropStore()
+        elif backend == "local":
+            self.backend = LocalCropStore(directory)
+        else:
+            raise ValueError(f"Unknown crop store backend: {backend}")
+
+    async def put(self, data: bytes) -> str:
+        """Store image bytes and return their content id"""
+        image_id = hashlib.sha256(data).hexdigest()
+        await self.backend.save(image_id, data)
+        return image_id
+
+    async def get(self, image_id: str) -> Optional[bytes]:
+        """Return image bytes for a content id, or None if missing"""
+        return await self.backend.load(image_id)
+
+    async def list_ids(self, stored_before: float) -> List[str]:
+        """Content ids last stored before a POSIX timestamp"""
+        return await self.backend.list_ids(stored_before)
+
+    async def delete(self, image_id: str):
+        """Remove an image (no error if it is missing)"""
+        await self.backend.delete(image_id)
+
+
+def crop_image_url(article: dict) -> str:
+    """API path serving an article's crop image ("" when it has none)"""
+    if article.get("crop_image_id") or article.get("crop_image_base64"):
+        return f"/api/articles/{article['article_id']}/image"
+    return ""
+
+
+def etag_matches(if_none_match: Optional[str], image_id: str) -> bool:
+    """
+    Whether an If-None-Match header matches a crop's ETag: "*" or a list
+    of entity tags, compared weakly (W/"x" matches "x"), per RFC 9110
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return image_id in ENTITY_TAG.findall(if_none_match)
+
+
+def crop_content_type(article: dict) -> str:
+    """MIME type of an article's stored crop image"""
+    return CONTENT_TYPES.get(article.get("crop_image_format", "JPEG"), "image/jpeg")
+
+
+# Global crop store instance
+crop_store = CropStore(backend=settings.CROP_STORE, directory=settings.CROP_STORE_DIR)
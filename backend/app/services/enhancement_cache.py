@@ -0,0 +1,111 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+from app.models.database import get_database
+from app.config import settings
+
+
+def normalize_content(text: str) -> str:
+    """Whitespace-insensitive form of article text (re-extractions differ in line breaks)"""
+    return " ".join((text or "").split())
+
+
+class EnhancementCache:
+    """
+    Persistent cache of AI enhancement results in the `enhancement_cache` collection.
+
+    Entries are keyed by a SHA-256 of (normalized content, original title,
+    prompt version, model name), so a re-uploaded edition or a wire story
+    printed in several papers skips the LLM call. The collection is bounded
+    to `max_entries`; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, enabled: bool = True, max_entries: int = 200000):
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content: str, title: str, prompt_version: str, model_name: str) -> str:
+        material = "\x1f".join([
+            normalize_content(content),
+            normalize_content(title),
+            prompt_version,
+            model_name or ""
+        ])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """Return {key: result} for the cached keys, marking them recently used"""
+        if not self.enabled or not keys:
+            return {}
+
+        db = get_database()
+        found = {}
+        async for doc in db.enhancement_cache.find({"_id": {"$in": list(set(keys))}}):
+            found[doc["_id"]] = doc["result"]
+
+        if found:
+            await db.enhancement_cache.update_many(
+                {"_id": {"$in": list(found)}},
+                {"$set": {"last_used_at": datetime.utcnow()}}
+            )
+
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    async def put_many(self, entries: Dict[str, Dict]):
+        """Store enhancement results, then trim the collection back to max_entries"""
+        if not self.enabled or not entries:
+            return
+
+        db = get_database()
+        now = datetime.utcnow()
+        await db.enhancement_cache.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": key},
+                    {"$set": {"result": result, "last_used_at": now}, "$setOnInsert": {"created_at": now}},
+                    upsert=True
+                )
+                for key, result in entries.items()
+            ],
+            ordered=False
+        )
+        await self._evict()
+
+    async def _evict(self):
+        db = get_database()
+        overflow = await db.enhancement_cache.estimated_document_count() - self.max_entries
+        if overflow <= 0:
+            return
+
+        # Evict a little extra so the next few puts do not each trigger a trim
+        limit = overflow + self.max_entries // 100
+        cursor = db.enhancement_cache.find({}, {"_id": 1}).sort("last_used_at", 1).limit(limit)
+        stale = [doc["_id"] async for doc in cursor]
+        if stale:
+            await db.enhancement_cache.delete_many({"_id": {"$in": stale}})
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Global enhancement cache instance
+enhancement_cache = EnhancementCache(
+    enabled=settings.ENHANCEMENT_CACHE,
+    max_entries=settings.ENHANCEMENT_CACHE_MAX_ENTRIES
+)
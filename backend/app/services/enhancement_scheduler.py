@@ -0,0 +1,166 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Tuple, TypeVar
+
+from app.services.gemini_processor import GeminiRateLimitError
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter shared by every job in the process.
+    A rate of 0 disables limiting. pause() stops all acquisitions for a
+    while, which is how a 429 from the provider slows down every caller.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._paused_until > now:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                if self.rate <= 0:
+                    return
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class EnhancementScheduler:
+    """
+    Process-wide scheduler for AI enhancement requests.
+
+    A fixed pool of worker tasks (the sliding window) keeps up to
+    `max_concurrency` requests in flight across all jobs. Workers pick work
+    round-robin across jobs, so one large edition cannot starve the others.
+    Every request takes a token from the shared bucket, and rate-limit errors
+    are retried with exponential backoff and full jitter. A request must make
+    at most one provider call, so that each call is covered by its own token
+    and retry (see JobProcessor.request_enhancements).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        requests_per_minute: float = 0,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(
+            rate_per_second=requests_per_minute / 60.0,
+            capacity=max(1.0, requests_per_minute / 60.0 * 5)
+        )
+
+        self._pending: Dict[str, Deque[Tuple[Callable[[], Awaitable], asyncio.Future]]] = {}
+        self._rotation: Deque[str] = deque()
+        self._available = asyncio.Semaphore(0)
+        self._workers = []
+        self.retries = 0
+
+    def _ensure_workers(self):
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_concurrency:
+            self._workers.append(asyncio.create_task(self._worker_loop()))
+
+    async def submit(self, job_id: str, request: Callable[[], Awaitable[T]]) -> T:
+        """Queue a request for a job and wait for its result"""
+        self._ensure_workers()
+
+        future = asyncio.get_running_loop().create_future()
+        if job_id not in self._pending:
+            self._pending[job_id] = deque()
+            self._rotation.append(job_id)
+        self._pending[job_id].append((request, future))
+        self._available.release()
+
+        return await future
+
+    def _next_request(self) -> Tuple[Callable[[], Awaitable], asyncio.Future]:
+        """Take the next request, rotating across jobs with pending work"""
+        job_id = self._rotation.popleft()
+        queue = self._pending[job_id]
+        request, future = queue.popleft()
+
+        if queue:
+            self._rotation.append(job_id)
+        else:
+            del self._pending[job_id]
+
+        return request, future
+
+    async def _worker_loop(self):
+        while True:
+            await self._available.acquire()
+            request, future = self._next_request()
+            if future.cancelled():
+                continue
+
+            try:
+                result = await self._call_with_retry(request)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def _call_with_retry(self, request: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                return await request()
+            except GeminiRateLimitError:
+                if attempt >= self.max_retries:
+                    raise
+
+                # Exponential backoff with full jitter; pausing the bucket backs off every job
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                self.bucket.pause(delay)
+                self.retries += 1
+                attempt += 1
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queued": sum(len(queue) for queue in self._pending.values()),
+            "jobs_waiting": len(self._pending),
+            "rate_limit_retries": self.retries
+        }
+
+
+# Global enhancement scheduler instance (shared by all jobs in this process)
+enhancement_scheduler = EnhancementScheduler(
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    backoff_base=settings.GEMINI_BACKOFF_BASE,
+    backoff_max=settings.GEMINI_BACKOFF_MAX
+)
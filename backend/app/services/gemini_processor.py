@@ -1,54 +1,103 @@
-import google.generativeai as genai
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
 import json
 import re
+import threading
 from app.config import settings
 
+# Multi-article enhancement: characters of each article sent, and rough
+# token overheads for the shared instructions and per-article JSON wrapping
+BATCH_ARTICLE_CHARS = 3000
+BATCH_PROMPT_TOKENS = 300
+BATCH_ARTICLE_OVERHEAD_TOKENS = 40
+
+# Bump whenever the enhancement prompts or result cleaning change, so cached
+# enhancement results from older prompts are no longer reused
+ENHANCE_PROMPT_VERSION = "enhance-v1"
+
+
+class GeminiRateLimitError(Exception):
+    """Gemini rejected a request because of rate limits or quota (HTTP 429)"""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an exception from the Gemini SDK is a 429 / quota rejection"""
+    if getattr(error, "code", None) == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in ("429", "resource exhausted", "resource_exhausted", "quota"))
+
 
 class GeminiProcessor:
-    def __init__(self):
-        self.enabled = settings.USE_GEMINI and settings.GEMINI_API_KEY
-        if self.enabled and settings.GEMINI_API_KEY != "your_gemini_api_key_here":
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-
-                # Try multiple model names in order of preference (updated for Gemini 2.x)
-                model_names = [
-                    'models/gemini-2.5-flash',      # Stable, fast (recommended)
-                    'models/gemini-flash-latest',    # Latest flash model
-                    'models/gemini-2.5-pro',         # Higher quality
-                    'models/gemini-pro-latest',      # Latest pro model
-                    'models/gemini-2.0-flash'        # Fallback to 2.0
-                ]
-
-                self.model = None
-                for model_name in model_names:
-                    try:
-                        self.model = genai.GenerativeModel(model_name)
-                        # Test the model
-                        test_response = self.model.generate_content("test")
-                        print(f"✓ Successfully loaded Gemini model: {model_name}")
-                        break
-                    except Exception as e:
-                        print(f"Failed to load {model_name}: {str(e)[:100]}")
-                        continue
-
-                if not self.model:
-                    print("❌ Could not load any Gemini model. Disabling Gemini.")
-                    self.enabled = False
+    def __init__(self, model=None):
+        self.enabled = bool(settings.USE_GEMINI and settings.GEMINI_API_KEY)
+        self.model = model
+        self.model_name = getattr(model, "model_name", "injected") if model is not None else None
+
+        if model is not None:
+            # Injected model (e.g. a local stub exposing generate_content); genai is never used
+            self.enabled = True
+        elif self.enabled and settings.GEMINI_API_KEY == "your_gemini_api_key_here":
+            print("❌ Gemini API key not configured properly")
+            self.enabled = False
+
+        # Model selection needs network round trips, so it is deferred to first use
+        self._initialized = model is not None or not self.enabled
+        self._init_lock = threading.Lock()
+
+    def ensure_ready(self) -> bool:
+        """Configure the client and pick a working model (once). Returns whether Gemini is usable"""
+        if self._initialized:
+            return self.enabled
+
+        with self._init_lock:
+            if not self._initialized:
+                self._load_model()
+                self._initialized = True
+
+        return self.enabled
+
+    def _load_model(self):
+        try:
+            import google.generativeai as genai
 
-            except Exception as e:
-                print(f"Gemini initialization failed: {e}")
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+
+            # Try multiple model names in order of preference (updated for Gemini 2.x)
+            model_names = [
+                'models/gemini-2.5-flash',      # Stable, fast (recommended)
+                'models/gemini-flash-latest',    # Latest flash model
+                'models/gemini-2.5-pro',         # Higher quality
+                'models/gemini-pro-latest',      # Latest pro model
+                'models/gemini-2.0-flash'        # Fallback to 2.0
+            ]
+
+            self.model = None
+            for model_name in model_names:
+                try:
+                    model = genai.GenerativeModel(model_name)
+                    # Test the model
+                    model.generate_content("test")
+                    self.model = model
+                    self.model_name = model_name
+                    print(f"✓ Successfully loaded Gemini model: {model_name}")
+                    break
+                except Exception as e:
+                    print(f"Failed to load {model_name}: {str(e)[:100]}")
+                    continue
+
+            if not self.model:
+                print("❌ Could not load any Gemini model. Disabling Gemini.")
                 self.enabled = False
-                self.model = None
-        else:
+
+        except Exception as e:
+            print(f"Gemini initialization failed: {e}")
+            self.enabled = False
             self.model = None
-            if self.enabled:
-                print("❌ Gemini API key not configured properly")
 
     def extract_keywords_with_ai(self, text: str, top_n: int = 10) -> List[str]:
         """Extract keywords using Gemini AI for better accuracy"""
-        if not self.enabled or not text or len(text.strip()) < 50:
+        if not self.ensure_ready() or not text or len(text.strip()) < 50:
             return []
 
         try:
@@ -88,7 +137,7 @@ Return format: ["keyword1", "keyword2", "keyword3", ...]
 
     def generate_article_summary(self, text: str, title: str, max_length: int = 200) -> str:
         """Generate a clean, coherent summary of the article using Gemini"""
-        if not self.enabled or not text or len(text.strip()) < 50:
+        if not self.ensure_ready() or not text or len(text.strip()) < 50:
             return text[:max_length] + "..."
 
         try:
@@ -125,7 +174,7 @@ Summary:"""
 
     def improve_article_title(self, text: str, original_title: str) -> str:
         """Improve or generate a better article title using Gemini"""
-        if not self.enabled or not text:
+        if not self.ensure_ready() or not text:
             return original_title
 
         try:
@@ -165,7 +214,7 @@ Headline:"""
 
     def enhance_article_content(self, text: str, title: str) -> str:
         """Clean up and enhance article content for better readability"""
-        if not self.enabled or not text or len(text.strip()) < 100:
+        if not self.ensure_ready() or not text or len(text.strip()) < 100:
             return text
 
         try:
@@ -200,20 +249,8 @@ Cleaned article:"""
             print(f"Gemini content enhancement failed: {e}")
             return text
 
-    def enhance_article_fast(self, text: str, original_title: str, top_keywords: int = 10) -> Dict:
-        """
-        OPTIMIZED: Get title, summary, and keywords in ONE API call
-        Returns: {"title": str, "summary": str, "keywords": List[str]}
-        """
-        if not self.enabled or not text or len(text.strip()) < 50:
-            return {
-                "title": original_title,
-                "summary": text[:200] + "...",
-                "keywords": []
-            }
-
-        try:
-            prompt = f"""Analyze this news article and provide:
+    def _enhance_prompt(self, text: str, original_title: str, top_keywords: int) -> str:
+        return f"""Analyze this news article and provide:
 1. An improved headline (if the current one is unclear/incomplete)
 2. A professional 200-character summary
 3. The {top_keywords} most important keywords
@@ -236,48 +273,239 @@ Rules:
 - Keywords: 1-3 words each, lowercase, focus on main topics/entities
 - Return ONLY the JSON object, nothing else"""
 
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
+    def _parse_enhancement(self, result_text: str, text: str, original_title: str, top_keywords: int) -> Dict:
+        # Extract JSON from response
+        match = re.search(r'\{.*\}', result_text.strip(), re.DOTALL)
+        if match:
+            return self._clean_enhancement(json.loads(match.group()), text, original_title, top_keywords)
 
-            # Extract JSON from response
-            match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if match:
-                result = json.loads(match.group())
-
-                # Validate and clean results
-                title = result.get("title", original_title)
-                if len(title) < 10 or len(title) > 150:
-                    title = original_title
+        return self._fallback_enhancement(text, original_title)
 
-                summary = result.get("summary", text[:200] + "...")
-                if len(summary) > 250:
-                    summary = summary[:200].rsplit(' ', 1)[0] + "..."
+    def _handle_enhancement_error(self, e: Exception, text: str, original_title: str) -> Dict:
+        if is_rate_limit_error(e):
+            raise GeminiRateLimitError(str(e)) from e
+        print(f"Gemini fast enhancement failed: {e}")
+        return self._fallback_enhancement(text, original_title)
 
-                keywords = result.get("keywords", [])[:top_keywords]
+    def enhance_article_fast(self, text: str, original_title: str, top_keywords: int = 10) -> Dict:
+        """
+        OPTIMIZED: Get title, summary, and keywords in ONE API call
+        Returns: {"title": str, "summary": str, "keywords": List[str]}
+        Raises GeminiRateLimitError when the provider rejects the request with a 429.
+        """
+        if not self.ensure_ready() or not text or len(text.strip()) < 50:
+            return self._fallback_enhancement(text, original_title)
 
-                return {
-                    "title": title,
-                    "summary": summary,
-                    "keywords": keywords
-                }
+        try:
+            response = self.model.generate_content(self._enhance_prompt(text, original_title, top_keywords))
+            return self._parse_enhancement(response.text, text, original_title, top_keywords)
+        except Exception as e:
+            return self._handle_enhancement_error(e, text, original_title)
 
-            return {
-                "title": original_title,
-                "summary": text[:200] + "...",
-                "keywords": []
-            }
+    async def enhance_article_fast_async(self, text: str, original_title: str, top_keywords: int = 10) -> Dict:
+        """Async variant of enhance_article_fast (call ensure_ready() beforehand)"""
+        if not self.enabled or not self._initialized or not text or len(text.strip()) < 50:
+            return self._fallback_enhancement(text, original_title)
 
+        try:
+            response = await self._generate_async(self._enhance_prompt(text, original_title, top_keywords))
+            return self._parse_enhancement(response.text, text, original_title, top_keywords)
         except Exception as e:
-            print(f"Gemini fast enhancement failed: {e}")
-            return {
-                "title": original_title,
-                "summary": text[:200] + "...",
-                "keywords": []
+            return self._handle_enhancement_error(e, text, original_title)
+
+    async def _generate_async(self, prompt: str):
+        """Await the SDK's native async call (pooled gRPC channel, no thread per request)"""
+        generate_async = getattr(self.model, "generate_content_async", None)
+        if generate_async is None:
+            # Injected models without an async API still work, on a worker thread
+            return await asyncio.to_thread(self.model.generate_content, prompt)
+        return await generate_async(prompt)
+
+    def _fallback_enhancement(self, text: str, original_title: str) -> Dict:
+        """Enhancement result used when the AI result is missing or unusable"""
+        return {
+            "title": original_title,
+            "summary": text[:200] + "...",
+            "keywords": [],
+            "fallback": True
+        }
+
+    def _clean_enhancement(self, result: Dict, text: str, original_title: str, top_keywords: int) -> Dict:
+        """Validate and clean one parsed enhancement result"""
+        title = result.get("title", original_title)
+        if not isinstance(title, str) or len(title) < 10 or len(title) > 150:
+            title = original_title
+
+        summary = result.get("summary", text[:200] + "...")
+        if not isinstance(summary, str):
+            summary = text[:200] + "..."
+        if len(summary) > 250:
+            summary = summary[:200].rsplit(' ', 1)[0] + "..."
+
+        keywords = result.get("keywords", [])
+        if not isinstance(keywords, list):
+            keywords = []
+
+        return {
+            "title": title,
+            "summary": summary,
+            "keywords": [kw for kw in keywords if isinstance(kw, str)][:top_keywords]
+        }
+
+    def pack_batches(
+        self,
+        texts: List[str],
+        token_budget: Optional[int] = None,
+        max_articles: Optional[int] = None
+    ) -> List[List[int]]:
+        """
+        Group article indices into multi-article requests.
+        Each group stays under a rough prompt token budget (~4 chars per token).
+        """
+        token_budget = token_budget or settings.GEMINI_BATCH_TOKEN_BUDGET
+        max_articles = max_articles or settings.GEMINI_BATCH_MAX_ARTICLES
+
+        batches, current, current_tokens = [], [], BATCH_PROMPT_TOKENS
+        for index, text in enumerate(texts):
+            tokens = len(text[:BATCH_ARTICLE_CHARS]) // 4 + BATCH_ARTICLE_OVERHEAD_TOKENS
+            if current and (current_tokens + tokens > token_budget or len(current) >= max_articles):
+                batches.append(current)
+                current, current_tokens = [], BATCH_PROMPT_TOKENS
+            current.append(index)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _prepare_batch(self, texts: List[str], original_titles: List[str]) -> Tuple[List[Optional[Dict]], List[int]]:
+        """Resolve articles too short to enhance; return (results, indices still pending)"""
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending = []
+        for index, text in enumerate(texts):
+            if not text or len(text.strip()) < 50:
+                results[index] = self._fallback_enhancement(text, original_titles[index])
+            else:
+                pending.append(index)
+        return results, pending
+
+    def _batch_prompt(self, texts: List[str], original_titles: List[str], pending: List[int], top_keywords: int) -> str:
+        payload = [
+            {
+                "index": index,
+                "headline": original_titles[index],
+                "text": texts[index][:BATCH_ARTICLE_CHARS]
             }
+            for index in pending
+        ]
+
+        return f"""Analyze each of the following news articles and, for EACH one, provide:
+1. An improved headline (if the current one is unclear/incomplete)
+2. A professional 200-character summary
+3. The {top_keywords} most important keywords
+
+Articles (JSON):
+{json.dumps(payload, ensure_ascii=False)}
+
+IMPORTANT: Return ONLY a valid JSON array with one object per article, in this exact format:
+[
+  {{
+    "index": 0,
+    "title": "Improved Headline Here",
+    "summary": "Professional summary in 200 characters...",
+    "keywords": ["keyword1", "keyword2", "keyword3"]
+  }}
+]
+
+Rules:
+- "index" must be copied from the article it describes
+- Title: Clear, 5-15 words, title case, no clickbait
+- Summary: Exactly 200 characters max, professional news style
+- Keywords: 1-3 words each, lowercase, focus on main topics/entities
+- Return ONLY the JSON array, nothing else"""
+
+    def _apply_batch_response(
+        self,
+        result_text: str,
+        texts: List[str],
+        original_titles: List[str],
+        results: List[Optional[Dict]],
+        pending: List[int],
+        top_keywords: int
+    ):
+        """Fill `results` from a JSON array reply, matching entries back by index"""
+        match = re.search(r'\[.*\]', result_text.strip(), re.DOTALL)
+        if not match:
+            return
+
+        for item in json.loads(match.group()):
+            index = item.get("index") if isinstance(item, dict) else None
+            if isinstance(index, int) and index in pending and results[index] is None:
+                results[index] = self._clean_enhancement(
+                    item, texts[index], original_titles[index], top_keywords
+                )
+
+    def _handle_batch_error(self, e: Exception):
+        if is_rate_limit_error(e):
+            raise GeminiRateLimitError(str(e)) from e
+        print(f"Gemini batch enhancement failed: {e}")
+
+    def enhance_articles_batch(
+        self,
+        texts: List[str],
+        original_titles: List[str],
+        top_keywords: int = 10
+    ) -> List[Optional[Dict]]:
+        """
+        Enhance several articles with ONE API call.
+        The model returns a JSON array matched back to articles by index.
+        Returns one {"title", "summary", "keywords"} dict per input article,
+        or None for articles the reply left out (or the call failed for);
+        the caller retries those as single-article requests.
+        Raises GeminiRateLimitError when the provider rejects the request with a 429.
+        """
+        if len(texts) == 1:
+            return [self.enhance_article_fast(texts[0], original_titles[0], top_keywords)]
+
+        results, pending = self._prepare_batch(texts, original_titles)
+
+        if pending and self.ensure_ready():
+            try:
+                response = self.model.generate_content(
+                    self._batch_prompt(texts, original_titles, pending, top_keywords)
+                )
+                self._apply_batch_response(response.text, texts, original_titles, results, pending, top_keywords)
+            except Exception as e:
+                self._handle_batch_error(e)
+
+        return results
+
+    async def enhance_articles_batch_async(
+        self,
+        texts: List[str],
+        original_titles: List[str],
+        top_keywords: int = 10
+    ) -> List[Optional[Dict]]:
+        """Async variant of enhance_articles_batch (call ensure_ready() beforehand)"""
+        if len(texts) == 1:
+            return [await self.enhance_article_fast_async(texts[0], original_titles[0], top_keywords)]
+
+        results, pending = self._prepare_batch(texts, original_titles)
+
+        if pending and self.enabled and self._initialized:
+            try:
+                response = await self._generate_async(
+                    self._batch_prompt(texts, original_titles, pending, top_keywords)
+                )
+                self._apply_batch_response(response.text, texts, original_titles, results, pending, top_keywords)
+            except Exception as e:
+                self._handle_batch_error(e)
+
+        return results
 
     def analyze_article_relevance(self, articles: List[Dict], keyword: str) -> List[Dict]:
         """Use Gemini to rank articles by relevance to a keyword"""
-        if not self.enabled or not articles:
+        if not self.ensure_ready() or not articles:
             return articles
 
         try:
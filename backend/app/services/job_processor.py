@@ -1,13 +1,23 @@
 import asyncio
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime
-from collections import Counter
+from collections import Counter, deque
 import uuid
 import os
 
-from app.services.pdf_processor import PDFProcessor
+from pymongo import ReplaceOne, UpdateOne
+
+from app.services.pdf_processor import PDFProcessor, process_page_range
+from app.services.pipeline_executor import pipeline_executor
+from app.services.crop_store import crop_store
+from app.services.vector_index import vector_index, pack_embedding
+from app.services.bm25_index import bm25_index
 from app.services.nlp_processor import NLPProcessor
-from app.services.gemini_processor import GeminiProcessor
+from app.services.gemini_processor import GeminiProcessor, GeminiRateLimitError, ENHANCE_PROMPT_VERSION
+from app.services.enhancement_cache import enhancement_cache
+from app.services.keyword_search import normalize_keywords, add_to_vocabulary
+from app.services.enhancement_scheduler import enhancement_scheduler
+from app.services.job_queue import LeaseLostError
 from app.models.database import get_database
 from app.config import settings
 
@@ -16,9 +26,61 @@ class JobProcessor:
     def __init__(self):
         self.nlp_processor = NLPProcessor()
         self.gemini_processor = GeminiProcessor()
+        # Page ranges rendered but not yet consumed, across all jobs of this process:
+        # ranges never exceed MAX_RENDERED_PAGES pages, so neither do the slots together
+        self.pages_per_range = max(1, min(settings.PIPELINE_PAGES_PER_TASK, settings.MAX_RENDERED_PAGES))
+        self._range_slots = asyncio.Semaphore(max(1, settings.MAX_RENDERED_PAGES // self.pages_per_range))
 
-    async def update_job_status(self, job_id: str, status: str, step: str, progress: int, error: str = None):
-        """Update job status in database"""
+    async def _scheduled_enhancement(self, job_id: str, request):
+        """Run one provider request through the enhancement scheduler; None once retries are exhausted"""
+        try:
+            # Rate-limited, fair-shared slot in the process-wide scheduler
+            return await enhancement_scheduler.submit(job_id, request)
+        except GeminiRateLimitError as e:
+            print(f"Gemini still rate limited after retries, using spaCy: {e}")
+            return None
+
+    async def request_enhancements(self, job_id: str, articles: List[Dict]) -> List[Optional[Dict]]:
+        """
+        AI results for a group of articles: one batch request, then one request
+        per article the reply left out. Each is its own scheduler request, so
+        every provider call takes a token and is retried on 429 on its own.
+        None marks articles left to the spaCy fallback.
+        """
+        contents = [article["content"] for article in articles]
+        titles = [article["title"] for article in articles]
+        if settings.GEMINI_ASYNC:
+            request = lambda: self.gemini_processor.enhance_articles_batch_async(contents, titles)
+        else:
+            request = lambda: asyncio.to_thread(self.gemini_processor.enhance_articles_batch, contents, titles)
+
+        results = await self._scheduled_enhancement(job_id, request)
+        if results is None:
+            return [None] * len(articles)
+
+        def single_request(index):
+            if settings.GEMINI_ASYNC:
+                return lambda: self.gemini_processor.enhance_article_fast_async(contents[index], titles[index])
+            return lambda: asyncio.to_thread(
+                self.gemini_processor.enhance_article_fast, contents[index], titles[index]
+            )
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        retried = await asyncio.gather(*(
+            self._scheduled_enhancement(job_id, single_request(index)) for index in missing
+        ))
+        for index, result in zip(missing, retried):
+            results[index] = result
+        return results
+
+    async def update_job_status(
+        self, job_id: str, status: str, step: str, progress: int, error: str = None, worker_id: str = None
+    ):
+        """
+        Update job status in database.
+        With worker_id (queued jobs) the write is fenced on the lease holder and
+        raises LeaseLostError if another worker has taken the job over.
+        """
         db = get_database()
 
         update_data = {
@@ -31,102 +93,322 @@ class JobProcessor:
         if error:
             update_data["error"] = error
 
-        await db.jobs.update_one(
-            {"job_id": job_id},
-            {"$set": update_data}
-        )
+        job_filter = {"job_id": job_id}
+        if worker_id is not None:
+            job_filter["worker_id"] = worker_id
 
-    async def process_pdf(self, job_id: str, pdf_path: str):
-        """Process PDF file and extract articles"""
-        try:
-            # Initialize job
-            await self.update_job_status(job_id, "processing", "Starting...", 0)
+        result = await db.jobs.update_one(job_filter, {"$set": update_data})
+        if worker_id is not None and result.matched_count == 0:
+            raise LeaseLostError(f"Job {job_id} is no longer leased to {worker_id}")
 
-            # Step 1: Extract text and images
-            await self.update_job_status(job_id, "processing", "Extracting text from PDF...", 10)
-            pdf_processor = PDFProcessor(pdf_path)
+    async def store_articles(self, job_id: str, articles: List[Dict]):
+        """
+        Store articles with batched bulk writes.
+        Upserts on article_id so a retried job never hits duplicate keys.
+        """
+        db = get_database()
+        batch_size = max(1, settings.ARTICLE_BATCH_SIZE)
+        created_at = datetime.utcnow()
 
-            # Step 2: Extract page images
-            await self.update_job_status(job_id, "processing", "Processing PDF pages...", 20)
-            pages_data = pdf_processor.extract_text()
-            pdf_processor.extract_page_images()
+        for batch_start in range(0, len(articles), batch_size):
+            operations = []
+            for article in articles[batch_start:batch_start + batch_size]:
+                article["job_id"] = job_id
+                article["created_at"] = created_at
+                operations.append(
+                    ReplaceOne({"article_id": article["article_id"]}, article, upsert=True)
+                )
 
-            # Step 3: Split into articles
-            await self.update_job_status(job_id, "processing", "Detecting and splitting articles...", 30)
-            all_articles = pdf_processor.process_all()
+            await db.articles.bulk_write(operations, ordered=False)
+
+        await add_to_vocabulary(db, (
+            keyword for article in articles for keyword in article.get("keywords_normalized", [])
+        ))
+
+        # Drop leftovers from an earlier run of this job that produced more articles.
+        # Their crops may be shared, so they stay in the crop store until cleanup_crops.py
+        await db.articles.delete_many({
+            "job_id": job_id,
+            "article_id": {"$nin": [article["article_id"] for article in articles]}
+        })
+
+    async def update_reverse_links(self, links: Dict[str, List], top_n: int = 5):
+        """
+        Offer newly ingested articles as related articles of existing ones.
+        `links` maps an existing article_id to [(new_article_id, score), ...];
+        each target keeps its best `top_n` links by stored score. Updates are
+        conditional on the list read, and re-read on conflict with another job.
+        """
+        db = get_database()
+        pending = dict(links)
+
+        for _ in range(3):
+            if not pending:
+                return
+
+            operations, targets = [], []
+            cursor = db.articles.find(
+                {"article_id": {"$in": list(pending)}},
+                {"_id": 0, "article_id": 1, "related_articles": 1, "related_scores": 1}
+            )
+            async for doc in cursor:
+                current_ids = doc.get("related_articles", [])
+                # Links stored before scores were kept are never displaced
+                current_scores = doc.get("related_scores") or [1.0] * len(current_ids)
+
+                merged = dict(zip(current_ids, current_scores))
+                for article_id, score in pending[doc["article_id"]]:
+                    merged[article_id] = max(score, merged.get(article_id, score))
+                best = sorted(merged.items(), key=lambda item: item[1], reverse=True)[:top_n]
+
+                if [article_id for article_id, _ in best] != current_ids:
+                    operations.append(UpdateOne(
+                        {"article_id": doc["article_id"], "related_articles": current_ids},
+                        {"$set": {
+                            "related_articles": [article_id for article_id, _ in best],
+                            "related_scores": [round(score, 4) for _, score in best]
+                        }}
+                    ))
+                    targets.append(doc["article_id"])
+
+            if not operations:
+                return
+
+            result = await db.articles.bulk_write(operations, ordered=False)
+            if result.matched_count == len(operations):
+                return
+
+            # Someone else changed a target in between: retry the whole set (unchanged ones are no-ops)
+            pending = {target: pending[target] for target in targets}
+
+    async def _iter_pdf_pages(self, pdf_processor: PDFProcessor) -> AsyncIterator[Dict]:
+        """
+        Run the single-pass PDF ingestion off the event loop, yielding pages in order.
+        The PDF is sharded into page ranges; each range in flight holds a slot
+        until its pages are consumed, so at most MAX_RENDERED_PAGES pages (and
+        their crops) are rendered ahead of the consumers in this process.
+        """
+        page_count = pdf_processor.page_count
+        pages_per_range = self.pages_per_range
+        window = 2 * pipeline_executor.workers
+        starts = deque(range(0, page_count, pages_per_range))
+        slots = self._range_slots
+
+        def run_range(start: int, stop: int):
+            if pipeline_executor.uses_processes:
+                # Each pool process opens its own copy of the document
+                return pipeline_executor.run(process_page_range, pdf_processor.pdf_path, start, stop)
+            # Thread mode: the already open document, on the single PDF thread
+            return pipeline_executor.run_pdf(pdf_processor.process_range, start, stop)
+
+        tasks = deque()
+        try:
+            while starts or tasks:
+                # Wait for a slot only with nothing in flight; otherwise take free
+                # slots only, so jobs never hold slots while waiting for more
+                while starts and len(tasks) < window and not (tasks and slots.locked()):
+                    await slots.acquire()
+                    start = starts.popleft()
+                    tasks.append(asyncio.ensure_future(run_range(start, min(start + pages_per_range, page_count))))
+
+                task = tasks.popleft()
+                try:
+                    for page_result in await task:
+                        yield page_result
+                finally:
+                    slots.release()
+        finally:
+            for task in tasks:
+                task.cancel()
+                slots.release()
+
+    async def process_pdf(self, job_id: str, pdf_path: str, worker_id: str = None):
+        """Process PDF file and extract articles (worker_id: the queue worker holding the lease)"""
+        try:
+            # Initialize job
+            await self.update_job_status(job_id, "processing", "Starting...", 0, worker_id=worker_id)
+
+            # Step 1: Open PDF
+            await self.update_job_status(
+                job_id, "processing", "Extracting text from PDF...", 10, worker_id=worker_id
+            )
+            pdf_processor = await pipeline_executor.run_pdf(PDFProcessor, pdf_path)
+            page_count = pdf_processor.page_count
+
+            # Steps 2-3: Single pass over pages (text, article splitting and crops)
+            all_articles = []
+            async for page_result in self._iter_pdf_pages(pdf_processor):
+                for article in page_result["articles"]:
+                    # Move crop bytes to the crop store right away instead of holding them
+                    crop_image = article.pop("crop_image", b"")
+                    if crop_image:
+                        article["crop_image_id"] = await crop_store.put(crop_image)
+                        article["crop_image_format"] = settings.CROP_IMAGE_FORMAT
+
+                all_articles.extend(page_result["articles"])
+
+                progress = 10 + int((page_result["page_num"] / page_count) * 30)
+                await self.update_job_status(
+                    job_id, "processing",
+                    f"Processing PDF pages ({page_result['page_num']}/{page_count})...",
+                    progress, worker_id=worker_id
+                )
 
             if not all_articles:
                 await self.update_job_status(
                     job_id, "failed", "No articles found", 100,
-                    "Could not extract any articles from the PDF"
+                    "Could not extract any articles from the PDF", worker_id=worker_id
                 )
-                pdf_processor.close()
+                await pipeline_executor.run_pdf(pdf_processor.close)
                 return
 
             # Make article IDs unique by incorporating job_id
             for i, article in enumerate(all_articles):
                 # Update article_id to be unique across all jobs
                 article["article_id"] = f"{job_id}_{i + 1}"
+                article["seq"] = i + 1  # Position in the edition (pagination key of /api/result)
 
             # Step 4: OPTIMIZED - Enhance with AI (parallel processing)
-            await self.update_job_status(job_id, "processing", "Enhancing with AI...", 40)
-
-            async def enhance_single_article(article, index):
-                """Process a single article with AI (runs in parallel)"""
-                if self.gemini_processor.enabled:
-                    # ONE API call instead of 3!
-                    result = await asyncio.to_thread(
-                        self.gemini_processor.enhance_article_fast,
-                        article["content"],
-                        article["title"]
-                    )
+            await self.update_job_status(
+                job_id, "processing", "Enhancing with AI...", 40, worker_id=worker_id
+            )
+            await asyncio.to_thread(self.gemini_processor.ensure_ready)
 
+            def apply_enhancement(article, result):
+                """Apply an AI result (or the no-AI fallback when result is None) to an article"""
+                if result is not None:
                     # Apply AI enhancements
                     article["title"] = result["title"]
                     article["summary"] = result["summary"]
-
-                    # Use AI keywords, fallback to spaCy if empty
-                    if result["keywords"]:
-                        article["keywords"] = result["keywords"]
-                    else:
-                        article["keywords"] = self.nlp_processor.extract_keywords(article["content"])
                 else:
                     # No AI - use spaCy/KeyBERT
                     article["summary"] = article["content"][:200] + "..."
-                    article["keywords"] = self.nlp_processor.extract_keywords(article["content"])
 
-                # Generate hashtags
-                article["hashtags"] = self.nlp_processor.generate_hashtags(article["keywords"])
+                # Use AI keywords; empty ones are filled by spaCy in one batch afterwards
+                article["keywords"] = result["keywords"] if result and result["keywords"] else []
 
-                return article
+            async def enhance_group(group):
+                """Enhance a group of articles with ONE API call (runs in parallel)"""
+                results = [None] * len(group)
+                if self.gemini_processor.enabled:
+                    results = await self.request_enhancements(job_id, group)
 
-            # Process articles in parallel batches of 10
-            batch_size = 10
-            for batch_start in range(0, len(all_articles), batch_size):
-                batch_end = min(batch_start + batch_size, len(all_articles))
-                batch = all_articles[batch_start:batch_end]
+                # Remember real AI results (not fallbacks) for identical text in later jobs
+                fresh = {
+                    cache_keys[id(article)]: result
+                    for article, result in zip(group, results)
+                    if result is not None and not result.get("fallback") and id(article) in cache_keys
+                }
+                if fresh:
+                    await enhancement_cache.put_many(fresh)
+
+                for article, result in zip(group, results):
+                    apply_enhancement(article, result)
+
+                return len(group)
+
+            # Reuse cached results for articles this model has already enhanced
+            cache_keys = {}
+            pending_articles = all_articles
+            cache_hits = 0
+            if self.gemini_processor.enabled and enhancement_cache.enabled:
+                cache_keys = {
+                    id(article): enhancement_cache.key(
+                        article["content"], article["title"],
+                        ENHANCE_PROMPT_VERSION, self.gemini_processor.model_name
+                    )
+                    for article in all_articles
+                }
+                cached = await enhancement_cache.get_many(list(cache_keys.values()))
+
+                pending_articles = []
+                for article in all_articles:
+                    result = cached.get(cache_keys[id(article)])
+                    if result is not None:
+                        apply_enhancement(article, result)
+                        cache_hits += 1
+                    else:
+                        pending_articles.append(article)
+
+            # Pack several articles per request when batching is on, else one per request
+            if self.gemini_processor.enabled and settings.GEMINI_BATCH_ENHANCE:
+                groups = [
+                    [pending_articles[i] for i in indices]
+                    for indices in self.gemini_processor.pack_batches(
+                        [article["content"] for article in pending_articles]
+                    )
+                ]
+            else:
+                groups = [[article] for article in pending_articles]
 
-                # Process batch in parallel
-                tasks = [enhance_single_article(article, i) for i, article in enumerate(batch)]
-                await asyncio.gather(*tasks)
+            # All requests are queued at once; the scheduler's sliding window bounds concurrency
+            enhanced = cache_hits
+            last_progress = 40
+            for finished in asyncio.as_completed([enhance_group(group) for group in groups]):
+                enhanced += await finished
 
                 # Update progress
-                progress = 40 + int((batch_end / len(all_articles)) * 30)
-                await self.update_job_status(
-                    job_id, "processing",
-                    f"AI enhancement ({batch_end}/{len(all_articles)})...",
-                    progress
+                progress = 40 + int((enhanced / len(all_articles)) * 30)
+                if progress > last_progress or enhanced == len(all_articles):
+                    last_progress = progress
+                    await self.update_job_status(
+                        job_id, "processing",
+                        f"AI enhancement ({enhanced}/{len(all_articles)})...",
+                        progress, worker_id=worker_id
+                    )
+
+            # Fallback keywords for every article without AI keywords, in one nlp.pipe pass
+            missing_keywords = [article for article in all_articles if not article["keywords"]]
+            if missing_keywords:
+                keyword_lists = await pipeline_executor.run_threaded(
+                    self.nlp_processor.extract_keywords_batch,
+                    [article["content"] for article in missing_keywords]
                 )
+                for article, keywords in zip(missing_keywords, keyword_lists):
+                    article["keywords"] = keywords
+
+            # Generate hashtags, and the snippet shown in search / keyword lists
+            for article in all_articles:
+                article["hashtags"] = self.nlp_processor.generate_hashtags(article["keywords"])
+                article["snippet"] = self.nlp_processor.extract_snippet(article["content"])
+                article["keywords_normalized"] = normalize_keywords(article["keywords"])
 
             # Step 5: Compute related articles
-            await self.update_job_status(job_id, "processing", "Computing related articles...", 75)
-            related_map = self.nlp_processor.find_related_articles(all_articles)
+            await self.update_job_status(
+                job_id, "processing", "Computing related articles...", 75, worker_id=worker_id
+            )
+            embeddings = await pipeline_executor.run_threaded(
+                self.nlp_processor.encode_texts,
+                [self.nlp_processor.article_search_text(article) for article in all_articles]
+            )
+            if settings.RELATED_ACROSS_JOBS:
+                # Pick up articles stored by other processes since the last sync
+                await vector_index.sync(force=True)
+            related_map = await pipeline_executor.run_threaded(
+                self.nlp_processor.find_related_articles, all_articles,
+                top_n=settings.RELATED_TOP_N,
+                embeddings=embeddings,
+                index=vector_index if settings.RELATED_ACROSS_JOBS else None
+            )
 
-            for article in all_articles:
-                article["related_articles"] = related_map.get(article["article_id"], [])
+            job_article_ids = {article["article_id"] for article in all_articles}
+            reverse_links = {}
+            embedded_at = datetime.utcnow()
+            for article, embedding in zip(all_articles, embeddings):
+                related = related_map.get(article["article_id"], [])
+                article["related_articles"] = [related_id for related_id, _ in related]
+                article["related_scores"] = [round(score, 4) for _, score in related]
+                article["embedding"] = pack_embedding(embedding)
+                article["embedded_at"] = embedded_at
+
+                for related_id, score in related:
+                    if related_id not in job_article_ids:
+                        reverse_links.setdefault(related_id, []).append((article["article_id"], score))
 
             # Step 6: Generate keywords summary
-            await self.update_job_status(job_id, "processing", "Generating summary...", 85)
+            await self.update_job_status(
+                job_id, "processing", "Generating summary...", 85, worker_id=worker_id
+            )
             all_keywords = []
             for article in all_articles:
                 all_keywords.extend(article["keywords"])
@@ -138,31 +420,46 @@ class JobProcessor:
             ]
 
             # Step 7: Store in database
-            await self.update_job_status(job_id, "processing", "Storing articles in database...", 90)
-
-            db = get_database()
+            await self.update_job_status(
+                job_id, "processing", "Storing articles in database...", 90, worker_id=worker_id
+            )
 
-            # Store articles
-            for article in all_articles:
-                article["job_id"] = job_id
-                article["created_at"] = datetime.utcnow()
+            await self.store_articles(job_id, all_articles)
+            await self.update_reverse_links(reverse_links, top_n=settings.RELATED_TOP_N)
+            await pipeline_executor.run_threaded(
+                vector_index.add, [article["article_id"] for article in all_articles], embeddings, all_articles
+            )
+            if bm25_index.loaded:
+                await pipeline_executor.run_threaded(
+                    bm25_index.add, all_articles, [embedded_at.timestamp()] * len(all_articles)
+                )
+                await bm25_index.maybe_save()
 
-                await db.articles.insert_one(article)
+            db = get_database()
 
             # Step 8: Finalize
-            await self.update_job_status(job_id, "processing", "Finalizing...", 95)
+            await self.update_job_status(job_id, "processing", "Finalizing...", 95, worker_id=worker_id)
 
-            # Store lightweight summary in job (without images to avoid size limit)
+            # Store lightweight summary in job
             result_summary = {
                 "job_id": job_id,
-                "pages": len(pages_data),
+                "pages": page_count,
                 "article_count": len(all_articles),
-                "keywords_summary": keywords_summary
+                "article_seq": True,
+                "keywords_summary": keywords_summary,
+                "enhancement_cache": {
+                    "hits": cache_hits,
+                    "misses": len(cache_keys) - cache_hits,
+                    "hit_rate": round(cache_hits / len(cache_keys), 4) if cache_keys else 0.0
+                }
             }
 
             # Update job with lightweight summary
+            completed_filter = {"job_id": job_id}
+            if worker_id is not None:
+                completed_filter["worker_id"] = worker_id
             await db.jobs.update_one(
-                {"job_id": job_id},
+                completed_filter,
                 {
                     "$set": {
                         "status": "completed",
@@ -175,7 +472,7 @@ class JobProcessor:
             )
 
             # Close PDF
-            pdf_processor.close()
+            await pipeline_executor.run_pdf(pdf_processor.close)
 
             # Clean up temporary file
             try:
@@ -183,12 +480,19 @@ class JobProcessor:
             except:
                 pass
 
+        except LeaseLostError as e:
+            # Another worker has taken the job over: leave its status and PDF alone
+            print(f"Stopped processing: {e}")
+
         except Exception as e:
             error_msg = str(e)
             print(f"Error processing PDF: {error_msg}")
-            await self.update_job_status(
-                job_id, "failed", "Processing failed", 100, error_msg
-            )
+            try:
+                await self.update_job_status(
+                    job_id, "failed", "Processing failed", 100, error_msg, worker_id=worker_id
+                )
+            except LeaseLostError:
+                return
 
             # Clean up
             try:
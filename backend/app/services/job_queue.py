@@ -0,0 +1,224 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.models.database import get_database
+from app.config import settings
+
+# Longest wait between claim attempts while Mongo keeps failing
+MAX_CLAIM_BACKOFF = 60.0
+
+
+class LeaseLostError(Exception):
+    """A worker's status write found the job leased to another worker"""
+
+
+class JobQueue:
+    """
+    Persistent job queue backed by the `jobs` collection.
+
+    Workers atomically claim pending jobs (or jobs whose lease expired because
+    the worker holding them died), keep the lease alive with heartbeats, and a
+    job is retried until it has been claimed JOB_MAX_ATTEMPTS times. A worker
+    that loses its lease stops the job, and its status writes are fenced on
+    worker_id, so two workers never process the same job.
+    """
+
+    def __init__(self, lease_seconds: int = 120, max_attempts: int = 3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    async def enqueue(self, job_id: str, pdf_path: str, claimable: bool = True):
+        """
+        Create a pending job record for an uploaded PDF.
+        claimable=False is for jobs the API processes itself: workers never claim them.
+        """
+        db = get_database()
+        now = datetime.utcnow()
+
+        await db.jobs.insert_one({
+            "job_id": job_id,
+            "status": "pending",
+            "step": "Initializing...",
+            "progress": 0,
+            "result": None,
+            "error": None,
+            "pdf_path": pdf_path,
+            "attempts": 0,
+            "claimable": claimable,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "created_at": now,
+            "updated_at": now
+        })
+
+    async def claim(self, worker_id: str) -> Optional[Dict]:
+        """Atomically claim the oldest runnable job, or return None"""
+        db = get_database()
+        now = datetime.utcnow()
+
+        return await db.jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending"},
+                    {"status": "processing", "lease_expires_at": {"$lt": now}}
+                ],
+                "claimable": {"$ne": False},
+                "attempts": {"$lt": self.max_attempts}
+            },
+            {
+                "$set": {
+                    "status": "processing",
+                    "step": "Claimed by worker...",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease on a claimed job. Returns False if the lease was lost"""
+        db = get_database()
+
+        result = await db.jobs.update_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": "processing"},
+            {"$set": {
+                "lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+            }}
+        )
+        return result.matched_count == 1
+
+    async def fail_exhausted(self):
+        """Fail jobs whose lease expired after the last allowed attempt"""
+        db = get_database()
+
+        cursor = db.jobs.find({
+            "status": "processing",
+            "lease_expires_at": {"$lt": datetime.utcnow()},
+            "attempts": {"$gte": self.max_attempts}
+        })
+
+        async for job in cursor:
+            await db.jobs.update_one(
+                {"job_id": job["job_id"], "status": "processing"},
+                {"$set": {
+                    "status": "failed",
+                    "step": "Processing failed",
+                    "progress": 100,
+                    "error": f"Job was abandoned by its worker {job['attempts']} times",
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+
+            try:
+                os.remove(job["pdf_path"])
+            except:
+                pass
+
+
+class JobWorker:
+    """Runs up to `concurrency` queued jobs at a time in this process"""
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2, poll_interval: float = 2.0):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        """Stop claiming new jobs; in-flight jobs are allowed to finish"""
+        self._stopping.set()
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _keep_alive(self, job_id: str, worker_id: str, processing: asyncio.Task):
+        """Heartbeat the lease until cancelled; cancel `processing` if the lease is lost"""
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                alive = await self.queue.heartbeat(job_id, worker_id)
+            except PyMongoError as e:
+                # The lease outlasts a few missed heartbeats: retry at the next interval
+                print(f"❌ Heartbeat for job {job_id} failed, retrying: {e}")
+                continue
+            if not alive:
+                print(f"Worker {worker_id} lost the lease on job {job_id}, stopping it")
+                processing.cancel()
+                return
+
+    async def _run_slot(self, slot: int):
+        # Imported here so the API process does not load the pipeline just to enqueue
+        from app.services.job_processor import job_processor
+
+        worker_id = f"{self.worker_prefix}:{slot}"
+        backoff = self.poll_interval
+
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.claim(worker_id)
+            except PyMongoError as e:
+                # Transient Mongo errors must not take the whole worker down: back off and poll again
+                print(f"❌ Worker {worker_id} could not claim a job, retrying in {backoff:g}s: {e}")
+                await self._sleep(backoff)
+                backoff = min(backoff * 2, MAX_CLAIM_BACKOFF)
+                continue
+            backoff = self.poll_interval
+
+            if not job:
+                await self._sleep(self.poll_interval)
+                continue
+
+            job_id = job["job_id"]
+            print(f"Worker {worker_id} claimed job {job_id} (attempt {job['attempts']})")
+
+            processing = asyncio.create_task(
+                job_processor.process_pdf(job_id, job["pdf_path"], worker_id=worker_id)
+            )
+            heartbeat = asyncio.create_task(self._keep_alive(job_id, worker_id, processing))
+            try:
+                await processing
+            except asyncio.CancelledError:
+                # Cancelled by _keep_alive: the job now belongs to another worker
+                if not heartbeat.done() or heartbeat.cancelled():
+                    raise
+            finally:
+                heartbeat.cancel()
+
+    async def _reap(self):
+        while not self._stopping.is_set():
+            try:
+                await self.queue.fail_exhausted()
+            except PyMongoError as e:
+                print(f"❌ Could not fail exhausted jobs, retrying later: {e}")
+            await self._sleep(self.queue.lease_seconds)
+
+    async def run(self):
+        """Run worker slots until stop() is called"""
+        print(f"Job worker {self.worker_prefix} started with {self.concurrency} slots")
+        await asyncio.gather(
+            self._reap(),
+            *(self._run_slot(slot) for slot in range(self.concurrency))
+        )
+        print(f"Job worker {self.worker_prefix} stopped")
+
+
+# Global job queue instance
+job_queue = JobQueue(
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
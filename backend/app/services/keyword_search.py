@@ -0,0 +1,137 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List
+
+from pymongo import UpdateOne
+
+from app.services.pipeline_executor import pipeline_executor
+
+# Leading characters fuzzy lookups take literally, so candidates come from an index range
+FUZZY_PREFIX_CHARS = 2
+# Most distinct keywords a fuzzy lookup reads and scores
+FUZZY_CANDIDATE_LIMIT = 5000
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Indexed form of a keyword: accent-folded, case-folded, single-spaced"""
+    decomposed = unicodedata.normalize("NFKD", keyword)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(folded.casefold().split())
+
+
+def normalize_keywords(keywords: Iterable[str]) -> List[str]:
+    """Distinct normalized forms of an article's keywords"""
+    return sorted({normalize_keyword(keyword) for keyword in keywords} - {""})
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance, giving up (returning max_distance + 1) once it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return previous[-1]
+
+
+def max_typos(keyword: str) -> int:
+    """Edits tolerated by fuzzy mode: none for very short keywords, then one per 4 characters"""
+    return 0 if len(keyword) < 4 else max(1, len(keyword) // 4)
+
+
+def fuzzy_matches(keyword: str, candidates: Iterable[str], max_distance: int) -> List[str]:
+    """Candidates within max_distance edits of keyword"""
+    return [
+        candidate for candidate in candidates
+        if edit_distance(keyword, candidate, max_distance) <= max_distance
+    ]
+
+
+async def add_to_vocabulary(db, keywords: Iterable[str]):
+    """
+    Record normalized keywords in keyword_vocabulary, one document per distinct
+    keyword ({_id, prefix, length}): the candidate source of fuzzy lookups.
+    Keywords are never removed; a stale one only matches no article.
+    """
+    keywords = sorted(set(keywords))
+    if not keywords:
+        return
+
+    await db.keyword_vocabulary.bulk_write([
+        UpdateOne(
+            {"_id": keyword},
+            {"$setOnInsert": {"prefix": keyword[:FUZZY_PREFIX_CHARS], "length": len(keyword)}},
+            upsert=True
+        )
+        for keyword in keywords
+    ], ordered=False)
+
+
+async def fuzzy_candidates(db, keyword: str, max_distance: int) -> List[str]:
+    """
+    Vocabulary keywords sharing keyword's prefix whose length allows a match,
+    closest lengths first and in _id order within a length: each read is one
+    (prefix, length, _id) index range, and at most FUZZY_CANDIDATE_LIMIT are read
+    """
+    prefix = keyword[:FUZZY_PREFIX_CHARS]
+    # Edit distance is at least the length difference
+    lengths = sorted(
+        range(max(len(keyword) - max_distance, len(prefix)), len(keyword) + max_distance + 1),
+        key=lambda length: (abs(length - len(keyword)), length)
+    )
+
+    candidates = []
+    for length in lengths:
+        remaining = FUZZY_CANDIDATE_LIMIT - len(candidates)
+        if remaining <= 0:
+            break
+        cursor = db.keyword_vocabulary.find(
+            {"prefix": prefix, "length": length}, {"_id": 1}
+        ).sort("_id", 1).limit(remaining)
+        candidates.extend([doc["_id"] async for doc in cursor])
+
+    return candidates
+
+
+def prefix_filter(prefix: str) -> Dict:
+    """Anchored, case-sensitive regex: answered from a keywords_normalized index range"""
+    return {"keywords_normalized": {"$regex": "^" + re.escape(prefix)}}
+
+
+async def keyword_filter(db, keyword: str, mode: str = "exact") -> Dict:
+    """
+    Mongo filter for articles tagged with `keyword`, using the keywords_normalized index.
+    - exact:  the normalized keyword itself
+    - prefix: normalized keywords starting with it
+    - fuzzy:  the keyword itself and vocabulary keywords within a few edits
+              of it; the first FUZZY_PREFIX_CHARS characters must match so
+              candidates come from index ranges of keyword_vocabulary, and at
+              most FUZZY_CANDIDATE_LIMIT of them are scored
+    """
+    normalized = normalize_keyword(keyword)
+
+    if mode == "prefix":
+        return prefix_filter(normalized)
+
+    if mode == "fuzzy":
+        limit = max_typos(normalized)
+        matches = []
+        if limit:
+            candidates = await fuzzy_candidates(db, normalized, limit)
+            # Edit distances are pure Python: score them off the event loop
+            matches = await pipeline_executor.run_threaded(fuzzy_matches, normalized, candidates, limit)
+        # The exact keyword always matches, whether or not it was read as a candidate
+        return {"keywords_normalized": {"$in": sorted(set(matches) | {normalized})}}
+
+    return {"keywords_normalized": normalized}
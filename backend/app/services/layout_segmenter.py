@@ -0,0 +1,164 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+
+def projection_cuts(lo: np.ndarray, hi: np.ndarray, min_gap: float) -> Tuple[np.ndarray, float]:
+    """
+    Empty runs of the projection profile of intervals [lo, hi] along one axis.
+    Returns the cut positions (middle of each gap at least `min_gap` wide)
+    and the widest such gap. Computed with a sorted sweep instead of a
+    binned histogram, so gutters are found exactly at any resolution.
+    """
+    order = np.argsort(lo, kind="stable")
+    lo = lo[order]
+    reach = np.maximum.accumulate(hi[order])
+
+    widths = lo[1:] - reach[:-1]
+    at = np.flatnonzero(widths >= min_gap)
+    if len(at) == 0:
+        return np.empty(0), 0.0
+
+    return (reach[:-1][at] + lo[1:][at]) / 2, float(widths[at].max())
+
+
+class LayoutSegmenter:
+    """
+    Column-aware article segmentation of one page.
+
+    Spans are split into text regions by recursive XY-cut: at each step
+    the region is cut at every gutter of its x-projection (columns) or
+    y-projection (stacked blocks), whichever has the widest gap. Inside a
+    region every headline starts an article; text above a region's first
+    headline continues the closest headline above it whose x-range
+    overlaps the region (e.g. a banner over several columns). Articles
+    get the text and the tight bounding box of their own spans only.
+    """
+
+    def __init__(self, min_column_gap: float = 6.0, row_gap_ratio: float = 0.6, padding: float = 4.0):
+        self.min_column_gap = min_column_gap
+        self.row_gap_ratio = row_gap_ratio
+        self.padding = padding
+
+    def regions(self, bboxes: np.ndarray) -> List[np.ndarray]:
+        """XY-cut leaves (arrays of span rows) in reading order"""
+        if len(bboxes) == 0:
+            return []
+
+        heights = bboxes[:, 3] - bboxes[:, 1]
+        min_row_gap = max(1.0, self.row_gap_ratio * float(np.median(heights)))
+
+        leaves = []
+        stack = [np.arange(len(bboxes))]
+        while stack:
+            rows = stack.pop()
+            parts = self._cut(bboxes[rows], min_row_gap)
+            if parts is None:
+                leaves.append(rows)
+                continue
+
+            # Pushed in reverse so the first part (left / top) is visited first
+            for part in reversed(parts):
+                stack.append(rows[part])
+
+        return leaves
+
+    def _cut(self, boxes: np.ndarray, min_row_gap: float) -> Optional[List[np.ndarray]]:
+        if len(boxes) < 2:
+            return None
+
+        x_cuts, x_gap = projection_cuts(boxes[:, 0], boxes[:, 2], self.min_column_gap)
+        y_cuts, y_gap = projection_cuts(boxes[:, 1], boxes[:, 3], min_row_gap)
+        if not len(x_cuts) and not len(y_cuts):
+            return None
+
+        if len(x_cuts) and x_gap >= y_gap:
+            labels = np.searchsorted(x_cuts, boxes[:, 0])
+        else:
+            labels = np.searchsorted(y_cuts, boxes[:, 1])
+
+        order = np.argsort(labels, kind="stable")
+        _, starts = np.unique(labels[order], return_index=True)
+        return np.split(order, starts[1:])
+
+    def segment(self, page_data: Dict, spans: Dict[str, np.ndarray], headline_rows: np.ndarray) -> List[Dict]:
+        """Articles of a page: {"page", "title", "content", "bbox"} in reading order"""
+        blocks = page_data["blocks"]
+        bboxes = spans["bbox"]
+        is_headline = np.zeros(len(blocks), dtype=bool)
+        is_headline[headline_rows] = True
+
+        # Pass 1: split each region into runs; a run of headline spans opens an article
+        articles = []      # [{"title_rows", "pieces": [(leaf_index, rows)]}]
+        orphans = []       # (leaf_index, rows) of text before a region's first headline
+        for leaf_index, rows in enumerate(self.regions(bboxes)):
+            rows = rows[np.lexsort((bboxes[rows, 0], bboxes[rows, 1]))]
+            heads = is_headline[rows]
+            opens = heads & ~np.concatenate([[False], heads[:-1]])
+            run_ids = np.cumsum(opens)
+
+            run_starts = np.flatnonzero(np.diff(run_ids, prepend=-1))
+            for start, end in zip(run_starts, np.append(run_starts[1:], len(rows))):
+                run = rows[start:end]
+                if run_ids[start] == 0:
+                    orphans.append((leaf_index, run))
+                else:
+                    title_count = int(np.argmin(heads[start:end])) if not heads[start:end].all() else end - start
+                    articles.append({"title_rows": run[:title_count], "pieces": [(leaf_index, run)]})
+
+        if not articles:
+            return []
+
+        # Pass 2: continue each orphan run under the closest overlapping headline above it
+        title_boxes = np.array([
+            [
+                bboxes[article["title_rows"], 0].min(), bboxes[article["title_rows"], 1].min(),
+                bboxes[article["title_rows"], 2].max(), bboxes[article["title_rows"], 3].max()
+            ]
+            for article in articles
+        ])
+        for leaf_index, run in orphans:
+            x0, y0 = bboxes[run, 0].min(), bboxes[run, 1].min()
+            x1 = bboxes[run, 2].max()
+            overlap = np.minimum(title_boxes[:, 2], x1) - np.maximum(title_boxes[:, 0], x0)
+            above = (title_boxes[:, 3] <= y0 + 1.0) & (overlap > 0)
+            if above.any():
+                candidates = np.flatnonzero(above)
+                owner = candidates[np.argmax(title_boxes[candidates, 3])]
+                articles[owner]["pieces"].append((leaf_index, run))
+
+        results = []
+        for article in articles:
+            rows = np.concatenate([run for _, run in sorted(article["pieces"], key=lambda piece: piece[0])])
+            content = " ".join(blocks[row]["text"] for row in rows)
+
+            # Only add if content is substantial
+            if len(content.strip()) <= 50:
+                continue
+
+            region = bboxes[rows]
+            bbox = [
+                float(max(0, region[:, 0].min() - self.padding)),
+                float(max(0, region[:, 1].min() - self.padding)),
+                float(min(page_data["width"], region[:, 2].max() + self.padding)),
+                float(min(page_data["height"], region[:, 3].max() + self.padding))
+            ]
+
+            title = " ".join(blocks[row]["text"].strip() for row in article["title_rows"])
+            results.append({
+                "page": page_data["page_num"],
+                "title": title[:200],  # Limit title length
+                "content": content,
+                "bbox": bbox
+            })
+
+        return results
+
+
+# Global layout segmenter instance
+layout_segmenter = LayoutSegmenter(
+    min_column_gap=settings.LAYOUT_MIN_COLUMN_GAP,
+    padding=settings.LAYOUT_PADDING
+)
@@ -0,0 +1,93 @@
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict
+
+SPACY_MODEL = "en_core_web_sm"
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of NLP models.
+    Each model is loaded lazily on first use, exactly once per process, even
+    when several threads ask for it at the same time.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self.load_seconds: Dict[str, float] = {}
+
+    def get(self, name: str, loader: Callable[[], Any]) -> Any:
+        """Return the model registered under `name`, loading it with `loader` if needed"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._registry_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        with lock:
+            model = self._models.get(name)
+            if model is None:
+                start = time.perf_counter()
+                model = loader()
+                self.load_seconds[name] = round(time.perf_counter() - start, 3)
+                self._models[name] = model
+                print(f"✓ Loaded {name} in {self.load_seconds[name]:.2f}s")
+
+        return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def stats(self) -> Dict:
+        return {
+            "loaded": sorted(self._models),
+            "load_seconds": dict(self.load_seconds),
+            "total_load_seconds": round(sum(self.load_seconds.values()), 3)
+        }
+
+
+def _load_spacy():
+    import spacy
+
+    # Download with: python -m spacy download en_core_web_sm
+    try:
+        return spacy.load(SPACY_MODEL)
+    except OSError:
+        print("Downloading spaCy model...")
+        subprocess.run([sys.executable, "-m", "spacy", "download", SPACY_MODEL])
+        return spacy.load(SPACY_MODEL)
+
+
+def _load_sentence_model():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(SENTENCE_MODEL)
+
+
+def _load_keybert():
+    from keybert import KeyBERT
+
+    # Reuse the shared sentence model instead of letting KeyBERT load its own copy
+    return KeyBERT(model=get_sentence_model())
+
+
+def get_spacy_model():
+    return model_registry.get(f"spacy:{SPACY_MODEL}", _load_spacy)
+
+
+def get_sentence_model():
+    return model_registry.get(f"sentence-transformers:{SENTENCE_MODEL}", _load_sentence_model)
+
+
+def get_keybert_model():
+    return model_registry.get("keybert", _load_keybert)
+
+
+# Global model registry instance
+model_registry = ModelRegistry()
@@ -1,34 +1,44 @@
-import spacy
-from keybert import KeyBERT
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import re
 from collections import Counter
 
+from app.services.model_registry import (
+    get_spacy_model,
+    get_sentence_model,
+    get_keybert_model
+)
+from app.config import settings
+
+# Keyword extraction only reads entities (ner) and noun chunks (tagger/parser)
+SPACY_KEYWORD_DISABLE = ["lemmatizer"]
+
+# Characters of each article passed to spaCy for keywords
+KEYWORD_TEXT_CHARS = 1000
+
+# Characters of content extract_snippet can look at (max_length + sentence slack)
+SNIPPET_SOURCE_CHARS = 400
+
 
 class NLPProcessor:
     def __init__(self, use_fast_mode=True):
-        # Load spaCy model (download with: python -m spacy download en_core_web_sm)
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            print("Downloading spaCy model...")
-            import subprocess
-            subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-            self.nlp = spacy.load("en_core_web_sm")
-
+        # Models come from the process-wide registry: loaded lazily, once per process
         self.use_fast_mode = use_fast_mode
 
-        # Load KeyBERT only if not in fast mode
-        if not use_fast_mode:
-            self.kw_model = KeyBERT()
-        else:
-            self.kw_model = None
+    @property
+    def nlp(self):
+        """spaCy pipeline (en_core_web_sm)"""
+        return get_spacy_model()
+
+    @property
+    def kw_model(self):
+        """KeyBERT, only used outside fast mode"""
+        return None if self.use_fast_mode else get_keybert_model()
 
-        # Load sentence transformer for embeddings
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+    @property
+    def embedder(self):
+        """Sentence transformer for embeddings"""
+        return get_sentence_model()
 
     def extract_keywords(self, text: str, top_n: int = 10) -> List[str]:
         """Extract keywords - uses fast spaCy mode by default"""
@@ -37,7 +47,7 @@ class NLPProcessor:
 
         # OPTIMIZATION: Limit text length to first 1000 characters for speed
         # Most important keywords are usually in the beginning of articles
-        text_sample = text[:1000]
+        text_sample = text[:KEYWORD_TEXT_CHARS]
 
         # Use fast spaCy-based extraction by default
         if self.use_fast_mode or not self.kw_model:
@@ -59,12 +69,39 @@ class NLPProcessor:
             print(f"KeyBERT extraction failed: {e}, falling back to spaCy")
             return self._extract_keywords_spacy(text_sample, top_n)
 
+    def extract_keywords_batch(self, texts: List[str], top_n: int = 10) -> List[List[str]]:
+        """
+        Extract keywords for many articles at once.
+        In fast mode all texts go through one nlp.pipe call, which batches the
+        tagger/parser/ner work instead of running the pipeline per article.
+        """
+        if not self.use_fast_mode:
+            return [self.extract_keywords(text, top_n) for text in texts]
+
+        results: List[List[str]] = [[] for _ in texts]
+        indices = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 20]
+        if not indices:
+            return results
+
+        docs = self.nlp.pipe(
+            (texts[i][:KEYWORD_TEXT_CHARS] for i in indices),
+            batch_size=settings.SPACY_BATCH_SIZE,
+            n_process=settings.SPACY_N_PROCESS,
+            disable=SPACY_KEYWORD_DISABLE
+        )
+        for index, doc in zip(indices, docs):
+            results[index] = self._keywords_from_doc(doc, top_n)
+
+        return results
+
     def _extract_keywords_spacy(self, text: str, top_n: int = 10) -> List[str]:
         """Fast keyword extraction using spaCy (optimized for speed)"""
         # Limit to first 2000 chars for speed (already limited to 1000 in caller)
-        doc = self.nlp(text[:2000])
+        doc = self.nlp(text[:2000], disable=SPACY_KEYWORD_DISABLE)
+        return self._keywords_from_doc(doc, top_n)
 
-        # Extract named entities and noun chunks
+    def _keywords_from_doc(self, doc, top_n: int = 10) -> List[str]:
+        """Most frequent named entities and short noun chunks of a parsed doc"""
         keywords = []
 
         # Named entities (most important keywords)
@@ -107,8 +144,23 @@ class NLPProcessor:
         """Get sentence embedding for text"""
         return self.embedder.encode(text)
 
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Get L2-normalized float32 embeddings for a batch of texts"""
+        embeddings = self.embedder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return embeddings.astype(np.float32)
+
+    def article_search_text(self, article: Dict) -> str:
+        """Text that represents an article in the search embedding space"""
+        return (
+            article.get("title", "") + " " +
+            " ".join(article.get("keywords", [])) + " " +
+            article.get("content", "")[:500]
+        )
+
     def compute_similarity(self, text1: str, text2: str) -> float:
         """Compute cosine similarity between two texts"""
+        from sklearn.metrics.pairwise import cosine_similarity
+
         emb1 = self.get_embedding(text1)
         emb2 = self.get_embedding(text2)
 
@@ -119,40 +171,48 @@ class NLPProcessor:
         self,
         articles: List[Dict],
         threshold: float = 0.3,
-        top_n: int = 5
-    ) -> Dict[str, List[str]]:
-        """Find related articles for each article using embeddings"""
+        top_n: int = 5,
+        embeddings: Optional[np.ndarray] = None,
+        index=None
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Find related articles for each article using embeddings.
+        Neighbors come from the same batch and, when a VectorIndex is given,
+        from the whole persisted corpus (other jobs, other days, other papers).
+        Returns {article_id: [(related_id, score), ...]} best first.
+        """
         if not articles:
             return {}
 
-        # Get embeddings for all articles
-        texts = [art.get("title", "") + " " + art.get("content", "")[:500] for art in articles]
-        embeddings = self.embedder.encode(texts)
-
-        # Compute similarity matrix
-        similarity_matrix = cosine_similarity(embeddings)
+        # Get embeddings for all articles (unless already computed)
+        if embeddings is None:
+            embeddings = self.encode_texts([self.article_search_text(art) for art in articles])
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms > 0, norms, 1)
+        article_ids = [article["article_id"] for article in articles]
+
+        # Neighbors inside the batch: vectorized top-k over the similarity matrix
+        similarity_matrix = embeddings @ embeddings.T
+        np.fill_diagonal(similarity_matrix, -np.inf)
+        keep = min(top_n, len(articles) - 1)
+        candidates = [[] for _ in articles]
+        if keep > 0:
+            top = np.argpartition(-similarity_matrix, keep - 1, axis=1)[:, :keep]
+            for i, row in enumerate(top):
+                candidates[i] = [(article_ids[j], float(similarity_matrix[i, j])) for j in row]
+
+        # Neighbors across the corpus, skipping this batch's own (possibly stale) vectors
+        if index is not None:
+            corpus_hits = index.search_batch(embeddings, top_n, min_score=threshold, exclude=set(article_ids))
+            for i, hits in enumerate(corpus_hits):
+                candidates[i].extend(hits)
 
         related_map = {}
-
-        for i, article in enumerate(articles):
-            article_id = article["article_id"]
-
-            # Get similarity scores for this article
-            similarities = similarity_matrix[i]
-
-            # Get indices of most similar articles (excluding itself)
-            similar_indices = []
-            for j, sim in enumerate(similarities):
-                if i != j and sim >= threshold:
-                    similar_indices.append((j, sim))
-
-            # Sort by similarity and get top N
-            similar_indices.sort(key=lambda x: x[1], reverse=True)
-            top_similar = similar_indices[:top_n]
-
-            # Get article IDs
-            related_ids = [articles[idx]["article_id"] for idx, sim in top_similar]
-            related_map[article_id] = related_ids
+        for article_id, pairs in zip(article_ids, candidates):
+            pairs = sorted((pair for pair in pairs if pair[1] >= threshold), key=lambda pair: pair[1], reverse=True)
+            related_map[article_id] = pairs[:top_n]
 
         return related_map
 
@@ -183,6 +243,8 @@ class NLPProcessor:
         if not articles:
             return []
 
+        from sklearn.metrics.pairwise import cosine_similarity
+
         # Get query embedding
         query_embedding = self.get_embedding(query)
 
@@ -1,54 +1,89 @@
 import fitz  # PyMuPDF
-import pdfplumber
 from PIL import Image
 import io
 import base64
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator, Optional, Callable
 import re
 from collections import Counter
 
+from app.services.layout_segmenter import layout_segmenter
+from app.config import settings
+
+CROP_MAX_WIDTH = 800  # Max width of article crops in pixels
+
+
+def span_arrays(blocks: List[Dict]) -> Dict[str, np.ndarray]:
+    """Column arrays (bbox, size, flags, stripped text length) of a page's text spans"""
+    return {
+        "bbox": np.array([block["bbox"] for block in blocks], dtype=np.float64).reshape(len(blocks), 4),
+        "size": np.array([block["size"] for block in blocks], dtype=np.float64),
+        "flags": np.array([block["flags"] for block in blocks], dtype=np.int64),
+        "text_len": np.array([len(block["text"].strip()) for block in blocks], dtype=np.int64),
+    }
+
+
+def page_spans(page_data: Dict) -> Dict[str, np.ndarray]:
+    """Span arrays of a page, built on demand for page data from older callers"""
+    if "spans" not in page_data:
+        page_data["spans"] = span_arrays(page_data["blocks"])
+    return page_data["spans"]
+
 
 class PDFProcessor:
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
         self.doc = fitz.open(pdf_path)
+        self._page_count = len(self.doc)  # Cached so callers on other threads never touch the document
         self.pages = []
         self.page_images = []
+        self.render_zoom = 2.0  # 2x zoom for better quality
+
+    def _extract_page_data(self, page, page_num: int) -> Dict:
+        """Extract text blocks and layout information from a single page"""
+        # Get text blocks with position information
+        blocks = page.get_text("dict")["blocks"]
+
+        text_blocks = []
+        for block in blocks:
+            if block.get("type") == 0:  # Text block
+                for line in block.get("lines", []):
+                    for span in line.get("spans", []):
+                        text_blocks.append({
+                            "text": span["text"],
+                            "bbox": span["bbox"],
+                            "size": span["size"],
+                            "flags": span["flags"],
+                            "font": span["font"],
+                        })
+
+        # Get full page text
+        full_text = page.get_text()
+
+        return {
+            "page_num": page_num,
+            "text": full_text,
+            "blocks": text_blocks,
+            "spans": span_arrays(text_blocks),
+            "width": page.rect.width,
+            "height": page.rect.height
+        }
+
+    def _render_page(self, page) -> Image.Image:
+        """Render a single page to a PIL image"""
+        # Render page to image (higher DPI for better quality)
+        mat = fitz.Matrix(self.render_zoom, self.render_zoom)
+        pix = page.get_pixmap(matrix=mat)
+
+        # Convert to PIL Image
+        return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
 
     def extract_text(self) -> List[Dict]:
         """Extract text from each page with layout information"""
         pages_data = []
 
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-
-            # Get text blocks with position information
-            blocks = page.get_text("dict")["blocks"]
-
-            text_blocks = []
-            for block in blocks:
-                if block.get("type") == 0:  # Text block
-                    for line in block.get("lines", []):
-                        for span in line.get("spans", []):
-                            text_blocks.append({
-                                "text": span["text"],
-                                "bbox": span["bbox"],
-                                "size": span["size"],
-                                "flags": span["flags"],
-                                "font": span["font"],
-                            })
-
-            # Get full page text
-            full_text = page.get_text()
-
-            pages_data.append({
-                "page_num": page_num + 1,
-                "text": full_text,
-                "blocks": text_blocks,
-                "width": page.rect.width,
-                "height": page.rect.height
-            })
+            pages_data.append(self._extract_page_data(self.doc[page_num], page_num + 1))
 
         self.pages = pages_data
         return pages_data
@@ -58,19 +93,32 @@ class PDFProcessor:
         images = []
 
         for page_num in range(len(self.doc)):
-            page = self.doc[page_num]
-
-            # Render page to image (higher DPI for better quality)
-            mat = fitz.Matrix(2.0, 2.0)  # 2x zoom for better quality
-            pix = page.get_pixmap(matrix=mat)
-
-            # Convert to PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            images.append(img)
+            images.append(self._render_page(self.doc[page_num]))
 
         self.page_images = images
         return images
 
+    def _headline_rows(self, spans: Dict[str, np.ndarray]) -> np.ndarray:
+        """Indices of headline spans, ordered top to bottom (ties keep reading order)"""
+        sizes = spans["size"]
+        positive = sizes[sizes > 0]
+        if len(positive) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        avg_size = positive.mean()
+        std_size = positive.std()
+
+        # Headline criteria:
+        # 1. Larger than average font size
+        # 2. Bold (flags & 16)
+        # 3. Text length > 10 characters
+        is_large = sizes > (avg_size + std_size * 0.5)
+        is_bold = (spans["flags"] & 16) != 0
+        is_substantial = spans["text_len"] > 10
+
+        rows = np.flatnonzero((is_large | is_bold) & is_substantial)
+        return rows[np.argsort(spans["bbox"][rows, 1], kind="stable")]
+
     def detect_headlines(self, page_data: Dict) -> List[Dict]:
         """Detect headlines based on font size and formatting"""
         blocks = page_data["blocks"]
@@ -78,38 +126,27 @@ class PDFProcessor:
         if not blocks:
             return []
 
-        # Calculate average font size
-        font_sizes = [b["size"] for b in blocks if b["size"] > 0]
-        if not font_sizes:
-            return []
-
-        avg_size = np.mean(font_sizes)
-        std_size = np.std(font_sizes)
-
-        headlines = []
-        for block in blocks:
-            # Headline criteria:
-            # 1. Larger than average font size
-            # 2. Bold (flags & 16)
-            # 3. Text length > 10 characters
-            is_large = block["size"] > (avg_size + std_size * 0.5)
-            is_bold = block["flags"] & 16  # Bold flag
-            is_substantial = len(block["text"].strip()) > 10
-
-            if (is_large or is_bold) and is_substantial:
-                headlines.append({
-                    "text": block["text"].strip(),
-                    "bbox": block["bbox"],
-                    "size": block["size"]
-                })
-
-        return headlines
+        rows = self._headline_rows(page_spans(page_data))
+        return [
+            {
+                "text": blocks[row]["text"].strip(),
+                "bbox": blocks[row]["bbox"],
+                "size": blocks[row]["size"]
+            }
+            for row in rows
+        ]
 
     def split_into_articles(self, page_data: Dict) -> List[Dict]:
-        """Split page into individual articles based on headlines and layout"""
-        headlines = self.detect_headlines(page_data)
+        """
+        Split page into individual articles based on headlines and layout.
+        Each span belongs to the last headline at or above it, found with one
+        searchsorted over the headline y-positions (O(spans log headlines)).
+        """
+        blocks = page_data["blocks"]
+        spans = page_spans(page_data)
+        headline_rows = self._headline_rows(spans) if blocks else np.empty(0, dtype=np.intp)
 
-        if not headlines:
+        if len(headline_rows) == 0:
             # If no headlines found, treat whole page as one article
             return [{
                 "page": page_data["page_num"],
@@ -118,63 +155,76 @@ class PDFProcessor:
                 "bbox": [0, 0, page_data["width"], page_data["height"]]
             }]
 
-        articles = []
-        blocks = page_data["blocks"]
-
-        # Sort headlines by vertical position
-        headlines.sort(key=lambda h: h["bbox"][1])
-
-        for i, headline in enumerate(headlines):
-            # Get content between this headline and the next
-            y_start = headline["bbox"][1]
-            y_end = headlines[i + 1]["bbox"][1] if i + 1 < len(headlines) else page_data["height"]
+        bboxes = spans["bbox"]
+        y_starts = bboxes[headline_rows, 1]
+        y_ends = np.append(y_starts[1:], page_data["height"])
 
-            # Collect text blocks in this region
-            article_blocks = []
-            x_min, y_min, x_max, y_max = float('inf'), y_start, 0, y_end
+        # Article of every span: the last headline starting at or above it,
+        # if the span also starts above that article's end
+        owner = np.searchsorted(y_starts, bboxes[:, 1], side="right") - 1
+        inside = (owner >= 0) & (bboxes[:, 1] < y_ends[np.maximum(owner, 0)])
+        span_rows = np.flatnonzero(inside)
+        span_rows = span_rows[np.argsort(owner[span_rows], kind="stable")]
+        owners = owner[span_rows]
 
-            for block in blocks:
-                block_y = block["bbox"][1]
-                if y_start <= block_y < y_end:
-                    article_blocks.append(block["text"])
-                    # Update bounding box
-                    x_min = min(x_min, block["bbox"][0])
-                    x_max = max(x_max, block["bbox"][2])
-                    y_min = min(y_min, block["bbox"][1])
-                    y_max = max(y_max, block["bbox"][3])
+        # Contiguous run of spans per article
+        articles_with_spans, run_starts = np.unique(owners, return_index=True)
+        run_ends = np.append(run_starts[1:], len(span_rows))
 
-            content = " ".join(article_blocks)
+        articles = []
+        padding = 10  # Add some padding to bbox
+        for article_index, start, end in zip(articles_with_spans, run_starts, run_ends):
+            rows = span_rows[start:end]
+            content = " ".join(blocks[row]["text"] for row in rows)
 
             # Only add if content is substantial
-            if len(content.strip()) > 50:
-                # Add some padding to bbox
-                padding = 10
-                bbox = [
-                    max(0, x_min - padding),
-                    max(0, y_min - padding),
-                    min(page_data["width"], x_max + padding),
-                    min(page_data["height"], y_max + padding)
-                ]
-
-                articles.append({
-                    "page": page_data["page_num"],
-                    "title": headline["text"][:200],  # Limit title length
-                    "content": content,
-                    "bbox": bbox
-                })
+            if len(content.strip()) <= 50:
+                continue
+
+            region = bboxes[rows]
+            x_min = region[:, 0].min()
+            x_max = max(0.0, region[:, 2].max())
+            y_min = y_starts[article_index]
+            y_max = max(y_ends[article_index], region[:, 3].max())
+
+            bbox = [
+                float(max(0, x_min - padding)),
+                float(max(0, y_min - padding)),
+                float(min(page_data["width"], x_max + padding)),
+                float(min(page_data["height"], y_max + padding))
+            ]
+
+            articles.append({
+                "page": page_data["page_num"],
+                "title": blocks[headline_rows[article_index]]["text"].strip()[:200],  # Limit title length
+                "content": content,
+                "bbox": bbox
+            })
 
         return articles
 
+    def segment_page(self, page_data: Dict) -> List[Dict]:
+        """Layout segmentation stage: split a page into articles with the configured strategy"""
+        if settings.LAYOUT_SEGMENTATION != "xycut" or not page_data["blocks"]:
+            return self.split_into_articles(page_data)
+
+        spans = page_spans(page_data)
+        articles = layout_segmenter.segment(page_data, spans, self._headline_rows(spans))
+        # Pages without usable headlines fall back to one article per page, as before
+        return articles or self.split_into_articles(page_data)
+
     def crop_article_image(self, page_num: int, bbox: List[float]) -> str:
         """Crop article region from page image and return as base64"""
         if page_num < 1 or page_num > len(self.page_images):
             return ""
 
-        page_img = self.page_images[page_num - 1]
+        return base64.b64encode(self._crop_from_image(self.page_images[page_num - 1], bbox)).decode()
 
-        # Convert bbox to pixel coordinates (2x zoom was applied)
+    def _crop_from_image(self, page_img: Image.Image, bbox: List[float]) -> bytes:
+        """Crop bbox from a rendered page image and encode it"""
+        # Convert bbox to pixel coordinates (render zoom was applied)
         x0, y0, x1, y1 = bbox
-        scale = 2.0  # Match the zoom factor used in extract_page_images
+        scale = self.render_zoom
 
         crop_box = (
             int(x0 * scale),
@@ -186,62 +236,123 @@ class PDFProcessor:
         try:
             cropped = page_img.crop(crop_box)
 
-            # OPTIMIZATION: Resize if too large to reduce Base64 size
-            max_width = 800  # Max width in pixels
-            if cropped.width > max_width:
-                ratio = max_width / cropped.width
-                new_size = (max_width, int(cropped.height * ratio))
+            # OPTIMIZATION: Resize if too large to reduce image size
+            if cropped.width > CROP_MAX_WIDTH:
+                ratio = CROP_MAX_WIDTH / cropped.width
+                new_size = (CROP_MAX_WIDTH, int(cropped.height * ratio))
                 cropped = cropped.resize(new_size, Image.LANCZOS)
 
-            # Convert to base64 using JPEG for smaller size
-            buffer = io.BytesIO()
-            # Convert RGBA to RGB if needed (JPEG doesn't support transparency)
-            if cropped.mode == 'RGBA':
-                rgb_img = Image.new('RGB', cropped.size, (255, 255, 255))
-                rgb_img.paste(cropped, mask=cropped.split()[3])
-                cropped = rgb_img
-
-            cropped.save(buffer, format="JPEG", optimize=True, quality=60)
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-
-            return img_str
+            return self._encode_crop(cropped)
         except Exception as e:
             print(f"Error cropping image: {e}")
-            return ""
+            return b""
+
+    def _render_crop(self, page: fitz.Page, bbox: List[float]) -> bytes:
+        """
+        Rasterize only the article's bbox (clip render) and encode it.
+        Zoom is chosen per article so the output is already at most
+        CROP_MAX_WIDTH wide, which avoids the full-page render and resize.
+        """
+        try:
+            clip = fitz.Rect(bbox) & page.rect
+            if clip.is_empty:
+                return b""
 
-    def process_all(self) -> List[Dict]:
-        """Process entire PDF and return all articles"""
-        # Extract text and images
-        pages_data = self.extract_text()
-        self.extract_page_images()
+            zoom = min(self.render_zoom, CROP_MAX_WIDTH / clip.width)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+            cropped = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+            pix = None
 
+            return self._encode_crop(cropped)
+        except Exception as e:
+            print(f"Error cropping image: {e}")
+            return b""
+
+    def _encode_crop(self, cropped: Image.Image) -> bytes:
+        """Encode a cropped article image as JPEG or WebP bytes"""
+        buffer = io.BytesIO()
+        # Convert RGBA to RGB if needed (JPEG doesn't support transparency)
+        if cropped.mode == 'RGBA':
+            rgb_img = Image.new('RGB', cropped.size, (255, 255, 255))
+            rgb_img.paste(cropped, mask=cropped.split()[3])
+            cropped = rgb_img
+
+        if settings.CROP_IMAGE_FORMAT == "WEBP":
+            cropped.save(buffer, format="WEBP", quality=60, method=4)
+        else:
+            cropped.save(buffer, format="JPEG", optimize=True, quality=60)
+        return buffer.getvalue()
+
+    def _iter_page_layouts(self, start: int, stop: int) -> Iterator[Tuple[int, fitz.Page, List[Dict]]]:
+        """Pipeline stage 1: parse each page and split it into articles"""
+        for page_index in range(start, stop):
+            page = self.doc[page_index]
+            page_data = self._extract_page_data(page, page_index + 1)
+            yield page_index + 1, page, self.segment_page(page_data)
+
+    def _iter_cropped_pages(self, layouts: Iterator[Tuple[int, fitz.Page, List[Dict]]]) -> Iterator[Dict]:
+        """Pipeline stage 2: clip-render and encode each article's region"""
+        page_count = len(self.doc)
+
+        for page_num, page, articles in layouts:
+            if articles:
+                for article in articles:
+                    article["crop_image"] = self._render_crop(page, article["bbox"])
+                fitz.TOOLS.store_shrink(100)
+
+            yield {
+                "page_num": page_num,
+                "page_count": page_count,
+                "articles": articles
+            }
+
+    def iter_pages(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Single-pass, streaming ingestion: visit each page exactly once.
+
+        For every page the text is extracted and split into articles, then
+        only the article regions are rasterized (no full-page render).
+
+        Jobs shard a PDF into page ranges (process_range) that the pipeline
+        executor runs in parallel; see JobProcessor._iter_pdf_pages.
+        Yields: {"page_num": int, "page_count": int, "articles": List[Dict]}
+        """
+        stop = len(self.doc) if stop is None else min(stop, len(self.doc))
+        return self._iter_cropped_pages(self._iter_page_layouts(start, stop))
+
+    def process_range(self, start: int, stop: int) -> List[Dict]:
+        """Results of pages [start, stop): one shard of a job"""
+        return list(self.iter_pages(start, stop))
+
+    def process_all(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+        """Process entire PDF in a single pass and return all articles"""
         all_articles = []
         article_counter = 1
 
-        for page_data in pages_data:
-            articles = self.split_into_articles(page_data)
-
-            for article in articles:
-                # Crop image for this article
-                crop_base64 = self.crop_article_image(
-                    article["page"],
-                    article["bbox"]
-                )
-
-                all_articles.append({
-                    "article_id": f"article_{article_counter}",
-                    "page": article["page"],
-                    "title": article["title"],
-                    "content": article["content"],
-                    "crop_image_base64": crop_base64,
-                    "bbox": article["bbox"]
-                })
-
+        for page_result in self.iter_pages():
+            for article in page_result["articles"]:
+                all_articles.append({"article_id": f"article_{article_counter}", **article})
                 article_counter += 1
 
+            if progress_callback:
+                progress_callback(page_result["page_num"], page_result["page_count"])
+
         return all_articles
 
+    @property
+    def page_count(self) -> int:
+        return self._page_count
+
     def close(self):
         """Close the PDF document"""
         if self.doc:
             self.doc.close()
+
+
+def process_page_range(pdf_path: str, start: int, stop: int) -> List[Dict]:
+    """Process-pool task: run the single-pass pipeline over one page shard with its own document"""
+    processor = PDFProcessor(pdf_path)
+    try:
+        return processor.process_range(start, stop)
+    finally:
+        processor.close()
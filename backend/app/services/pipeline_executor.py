@@ -0,0 +1,96 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class PipelineExecutor:
+    """
+    Runs CPU-bound pipeline stages off the asyncio event loop.
+
+    Stages that only need picklable, module-level functions (PDF parsing and
+    rendering) go to the configured pool - threads or processes. Stages that
+    use models loaded in this process (spaCy, SentenceTransformer) always run
+    on the thread pool so the models are not pickled or reloaded per call.
+
+    PyMuPDF is not thread-safe, so in this process every fitz call (open,
+    parse, render, close) goes through run_pdf, which shares one dedicated
+    thread across all jobs.
+    """
+
+    def __init__(self, mode: str = "process", workers: int = 4):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown pipeline executor mode: {mode}")
+
+        self.mode = mode
+        self.workers = max(1, workers)
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._pdf_thread: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.mode == "process"
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="pipeline"
+            )
+        return self._thread_pool
+
+    def _get_pdf_thread(self) -> ThreadPoolExecutor:
+        if self._pdf_thread is None:
+            self._pdf_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf")
+        return self._pdf_thread
+
+    def _get_pool(self) -> Executor:
+        if not self.uses_processes:
+            return self._get_thread_pool()
+
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run a picklable CPU-bound function on the configured pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), functools.partial(fn, *args, **kwargs))
+
+    async def run_threaded(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run a CPU-bound function that needs in-process state on the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_thread_pool(), functools.partial(fn, *args, **kwargs))
+
+    async def run_pdf(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run a function that touches PyMuPDF objects on the single PDF thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pdf_thread(), functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        """Shut down the worker pools"""
+        if self._thread_pool:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._pdf_thread:
+            self._pdf_thread.shutdown(wait=False, cancel_futures=True)
+            self._pdf_thread = None
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+# Global pipeline executor instance
+pipeline_executor = PipelineExecutor(
+    mode=settings.PIPELINE_EXECUTOR,
+    workers=settings.PIPELINE_WORKERS
+)
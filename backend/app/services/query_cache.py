@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.config import settings
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with an optional TTL and hit/miss counters"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class VersionedCache(LRUCache):
+    """LRU cache that is emptied whenever the version it was filled at changes"""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        super().__init__(max_size, ttl)
+        self.version = None
+
+    def check_version(self, version: int):
+        """Drop every entry if the underlying data moved to a new version"""
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+
+def normalize_query(query: str) -> str:
+    """Canonical cache key form of a search query"""
+    return " ".join(query.lower().split())
+
+
+# Normalized query -> query embedding (independent of the corpus)
+query_embedding_cache = LRUCache(
+    max_size=settings.QUERY_CACHE_SIZE,
+    ttl=settings.QUERY_CACHE_TTL
+)
+
+# (normalized query, search options) -> ranked results, valid for one index version
+search_result_cache = VersionedCache(
+    max_size=settings.QUERY_CACHE_SIZE,
+    ttl=settings.QUERY_CACHE_TTL
+)
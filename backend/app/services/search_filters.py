@@ -0,0 +1,127 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app.services.keyword_search import keyword_filter
+
+# SearchRequest fields that narrow a search
+FILTER_FIELDS = ("date_from", "date_to", "job_id", "page_from", "page_to", "keyword")
+
+
+def to_timestamp(value: datetime) -> float:
+    """POSIX timestamp; naive datetimes are UTC like the ones the app stores"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def active_filters(request) -> Dict:
+    """The filter fields set on a SearchRequest"""
+    return {
+        field: getattr(request, field)
+        for field in FILTER_FIELDS
+        if getattr(request, field) is not None
+    }
+
+
+async def mongo_filter(db, filters: Dict) -> Dict:
+    """The same filters as a Mongo query on the articles collection"""
+    query = {}
+    if "date_from" in filters or "date_to" in filters:
+        query["created_at"] = {}
+        if "date_from" in filters:
+            query["created_at"]["$gte"] = filters["date_from"]
+        if "date_to" in filters:
+            query["created_at"]["$lte"] = filters["date_to"]
+    if "job_id" in filters:
+        query["job_id"] = filters["job_id"]
+    if "page_from" in filters or "page_to" in filters:
+        query["page"] = {}
+        if "page_from" in filters:
+            query["page"]["$gte"] = filters["page_from"]
+        if "page_to" in filters:
+            query["page"]["$lte"] = filters["page_to"]
+    if "keyword" in filters:
+        query.update(await keyword_filter(db, filters["keyword"]))
+    return query
+
+
+class ArticleMetadata:
+    """
+    Filter columns (page, job, stored date) of a search index, one entry
+    per index row. filter_mask() turns SearchRequest filters into a
+    boolean row bitmap, so an index scores only the rows that pass.
+    Rows without metadata (page -1, job -1, date NaN) fail every filter
+    on that field.
+    """
+
+    def __init__(self):
+        self.pages = np.zeros(0, dtype=np.int32)
+        self.jobs = np.zeros(0, dtype=np.int32)
+        self.created = np.zeros(0, dtype=np.float64)
+        self.job_codes: Dict[str, int] = {}
+
+    def _reserve(self, size: int):
+        capacity = len(self.pages)
+        if size <= capacity:
+            return
+
+        new_capacity = max(size, capacity * 2, 1024)
+        extra = new_capacity - capacity
+        self.pages = np.concatenate([self.pages, np.full(extra, -1, dtype=np.int32)])
+        self.jobs = np.concatenate([self.jobs, np.full(extra, -1, dtype=np.int32)])
+        self.created = np.concatenate([self.created, np.full(extra, np.nan)])
+
+    def set(self, row: int, doc: Dict) -> bool:
+        """Record the filter fields of the article stored at `row`; returns whether they changed"""
+        self._reserve(row + 1)
+        job_id = doc.get("job_id")
+        created_at = doc.get("created_at")
+        values = (
+            doc.get("page", -1),
+            -1 if job_id is None else self.job_codes.setdefault(job_id, len(self.job_codes)),
+            np.nan if created_at is None else to_timestamp(created_at)
+        )
+
+        if (
+            self.pages[row] == values[0] and self.jobs[row] == values[1]
+            and np.array_equal(self.created[row], values[2], equal_nan=True)
+        ):
+            return False
+
+        self.pages[row], self.jobs[row], self.created[row] = values
+        return True
+
+    def take(self, rows: np.ndarray):
+        """Keep only `rows`, in order, renumbering them from 0 (index compaction)"""
+        self._reserve(int(rows.max()) + 1 if len(rows) else 0)
+        self.pages = self.pages[rows]
+        self.jobs = self.jobs[rows]
+        self.created = self.created[rows]
+
+    def filter_mask(self, size: int, filters: Dict, allowed_rows: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Rows [0, size) passing `filters` (and in `allowed_rows`, if given)"""
+        self._reserve(size)
+        mask = np.ones(size, dtype=bool)
+
+        if "job_id" in filters:
+            code = self.job_codes.get(filters["job_id"])
+            if code is None:
+                return np.zeros(size, dtype=bool)
+            mask &= self.jobs[:size] == code
+        if "page_from" in filters:
+            mask &= self.pages[:size] >= filters["page_from"]
+        if "page_to" in filters:
+            mask &= self.pages[:size] <= filters["page_to"]
+        if "date_from" in filters:
+            mask &= self.created[:size] >= to_timestamp(filters["date_from"])
+        if "date_to" in filters:
+            mask &= self.created[:size] <= to_timestamp(filters["date_to"])
+
+        if allowed_rows is not None:
+            allowed = np.zeros(size, dtype=bool)
+            allowed[np.fromiter(allowed_rows, dtype=np.int64)] = True
+            mask &= allowed
+
+        return mask
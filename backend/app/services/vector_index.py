@@ -0,0 +1,400 @@
+import asyncio
+import threading
+import time
+from array import array
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.models.database import get_database
+from app.services.search_filters import ArticleMetadata
+from app.services.pipeline_executor import pipeline_executor
+from app.config import settings
+
+# Rows scored per matmul chunk (bounds the float32 scratch copy)
+SCORE_CHUNK_ROWS = 65536
+
+# Re-read this much history on every sync so documents committed slightly
+# out of embedded_at order by concurrent jobs are not missed
+SYNC_OVERLAP = timedelta(minutes=2)
+
+
+def pack_embedding(vector: np.ndarray) -> bytes:
+    """Serialize a normalized embedding as compact float16 bytes"""
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def unpack_embedding(data: bytes) -> np.ndarray:
+    """Deserialize an embedding stored by pack_embedding"""
+    return np.frombuffer(data, dtype=np.float16)
+
+
+def _normalize(query: np.ndarray) -> np.ndarray:
+    query = np.asarray(query, dtype=np.float32).ravel()
+    norm = np.linalg.norm(query)
+    return query / norm if norm > 0 else query
+
+
+class VectorIndex:
+    """
+    In-process index over the normalized article embeddings stored in Mongo.
+
+    Vectors are kept as a contiguous float16 matrix. Small corpora are
+    searched exactly with a chunked matmul; once the index holds
+    `ivf_threshold` vectors an IVF (inverted file) coarse quantizer is
+    trained on a background thread and swapped in when done; queries then
+    only read the inverted lists of the `nprobe` closest clusters.
+    Filtered searches score exactly the rows passing the filter bitmap.
+    """
+
+    def __init__(self, ivf_threshold: int = 100000, nprobe: int = 8, sync_interval: float = 10.0):
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.sync_interval = sync_interval
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._size = 0
+        self._metadata = ArticleMetadata()
+
+        self._centroids: Optional[np.ndarray] = None
+        self._assign: Optional[np.ndarray] = None
+        self._lists: List[array] = []  # rows per cluster; may hold stale rows, checked against _assign
+        self._trained_size = 0
+        self._training = False
+        self._changed_while_training: Set[int] = set()
+
+        self._watermark = None
+        self._last_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, extra: int, dim: int):
+        """Grow the backing arrays (amortized doubling) to fit `extra` more rows"""
+        needed = self._size + extra
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if needed <= capacity:
+            return
+
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, dim), dtype=np.float16)
+        assign = np.full(new_capacity, -1, dtype=np.int32)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+            assign[:self._size] = self._assign[:self._size]
+        self._vectors = vectors
+        self._assign = assign
+
+    def add(self, article_ids: Sequence[str], vectors: np.ndarray, metadata: Optional[Sequence[Dict]] = None):
+        """Insert or replace vectors (and filter fields: page, job_id, created_at) for the given article ids"""
+        if len(article_ids) == 0:
+            return
+
+        vectors = np.asarray(vectors, dtype=np.float16).reshape(len(article_ids), -1)
+
+        with self._lock:
+            self._reserve(len(article_ids), vectors.shape[1])
+
+            changed_rows = []
+            metadata_changed = False
+            for i, (article_id, vector) in enumerate(zip(article_ids, vectors)):
+                row = self._rows.get(article_id)
+                unchanged = row is not None and np.array_equal(self._vectors[row], vector)
+                if row is None:
+                    row = self._size
+                    self._rows[article_id] = row
+                    self._ids.append(article_id)
+                    self._size += 1
+
+                if metadata is not None:
+                    metadata_changed |= self._metadata.set(row, metadata[i])
+                if unchanged:
+                    continue
+
+                self._vectors[row] = vector
+                changed_rows.append(row)
+
+            if not changed_rows:
+                if metadata_changed:
+                    self.version += 1
+                return
+
+            if self._centroids is not None:
+                self._assign_rows(np.asarray(changed_rows))
+            if self._training:
+                self._changed_while_training.update(changed_rows)
+            elif self._size >= self.ivf_threshold and self._size >= 2 * self._trained_size:
+                # Training takes seconds at this size: never hold the lock (or the caller) for it
+                self._training = True
+                threading.Thread(target=self._train_ivf, name="ivf-train", daemon=True).start()
+
+            self.version += 1
+
+    def _nearest_centroids(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+    def _assign_rows(self, rows: np.ndarray):
+        """Assign rows to their nearest cluster and append them to its inverted list"""
+        labels = self._nearest_centroids(self._vectors[rows].astype(np.float32), self._centroids)
+        self._assign[rows] = labels
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            self._lists[label].append(row)
+
+    def _train_ivf(self, iterations: int = 10):
+        """
+        Train a spherical k-means coarse quantizer on the rows present now,
+        build its inverted lists, then swap both in under the lock. Rows
+        added or replaced meanwhile are assigned at the swap.
+        """
+        try:
+            with self._lock:
+                n = self._size
+                # _reserve() replaces the matrix when it grows, so rows [0, n) of this one stay readable
+                vectors = self._vectors
+                self._changed_while_training = set()
+
+            nlist = int(min(4096, max(16, np.sqrt(n))))
+            rng = np.random.default_rng(0)
+
+            sample_rows = rng.choice(n, size=min(n, nlist * 64), replace=False)
+            sample = vectors[sample_rows].astype(np.float32)
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                non_empty = norms[:, 0] > 0
+                centroids[non_empty] = sums[non_empty] / norms[non_empty]
+
+            assign = np.empty(n, dtype=np.int32)
+            for start in range(0, n, SCORE_CHUNK_ROWS):
+                end = min(start + SCORE_CHUNK_ROWS, n)
+                assign[start:end] = self._nearest_centroids(vectors[start:end].astype(np.float32), centroids)
+
+            order = np.argsort(assign, kind="stable").astype(np.int32)
+            bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+            lists = [array("i", order[bounds[c]:bounds[c + 1]].tobytes()) for c in range(nlist)]
+
+            with self._lock:
+                self._centroids = centroids
+                self._assign[:n] = assign
+                self._lists = lists
+                late_rows = self._changed_while_training | set(range(n, self._size))
+                if late_rows:
+                    self._assign_rows(np.fromiter(sorted(late_rows), dtype=np.int64))
+                self._trained_size = n
+                self.version += 1
+        finally:
+            with self._lock:
+                self._training = False
+                self._changed_while_training = set()
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for a query (from the probed inverted lists), or None to score every row"""
+        if self._centroids is None:
+            return None
+
+        centroid_scores = self._centroids @ query
+        nprobe = min(self.nprobe, len(centroid_scores))
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        rows = np.concatenate([np.array(self._lists[cluster], dtype=np.int64) for cluster in probe])
+        # Replaced rows stay in their old list too: keep only rows still assigned to a probed cluster
+        rows = np.unique(rows)
+        return rows[np.isin(self._assign[rows], probe)]
+
+    def _snapshot(self) -> Tuple[np.ndarray, int, List[str]]:
+        """
+        Vectors, size and ids to score outside the lock (caller holds it).
+        add() only appends past `size` or swaps in a grown copy, so rows below
+        it stay valid; a row replaced meanwhile may be read as either version.
+        """
+        return self._vectors, self._size, self._ids
+
+    @staticmethod
+    def _score(vectors: np.ndarray, size: int, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        if rows is not None:
+            return vectors[rows].astype(np.float32) @ query
+
+        scores = np.empty(size, dtype=np.float32)
+        for start in range(0, size, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, size)
+            scores[start:end] = vectors[start:end].astype(np.float32) @ query
+        return scores
+
+    def filter_rows(self, filters: Dict, allowed_ids: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Rows passing the filters (and holding one of `allowed_ids`, if given)"""
+        with self._lock:
+            allowed_rows = None
+            if allowed_ids is not None:
+                allowed_rows = [self._rows[article_id] for article_id in allowed_ids if article_id in self._rows]
+            return np.flatnonzero(self._metadata.filter_mask(self._size, filters, allowed_rows))
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        min_score: float = -1.0,
+        filters: Optional[Dict] = None,
+        allowed_ids: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to k (article_id, cosine score) pairs, best first.
+        With `filters` (SearchRequest filter fields) or `allowed_ids`, only
+        the rows passing both are scored, exactly (no IVF probing).
+        """
+        rows = None
+        if filters or allowed_ids is not None:
+            rows = self.filter_rows(filters or {}, allowed_ids)
+        return self._search_one(_normalize(query), k, min_score, rows)
+
+    def _search_one(
+        self, query: np.ndarray, k: int, min_score: float, rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        # Pick the rows under the lock, score them outside it so add() and other searches never wait
+        with self._lock:
+            if self._size == 0 or k <= 0 or rows is not None and len(rows) == 0:
+                return []
+
+            if rows is None:
+                rows = self._candidate_rows(query)
+            vectors, size, ids = self._snapshot()
+
+        scores = self._score(vectors, size, query, rows)
+        if rows is None:
+            rows = np.arange(size)
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            (ids[rows[i]], float(scores[i]))
+            for i in top
+            if scores[i] > min_score
+        ]
+
+    def search_batch(
+        self,
+        queries: np.ndarray,
+        k: int,
+        min_score: float = -1.0,
+        exclude: Optional[Set[str]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k neighbors for many queries at once, ignoring `exclude` ids.
+        Exact search converts each float16 chunk once and scores it against
+        every query with one matmul, keeping a running top-k per query.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1)
+
+        with self._lock:
+            if self._size == 0 or k <= 0 or len(queries) == 0:
+                return [[] for _ in queries]
+
+            # Ask for enough extra rows that excluded ids cannot crowd out real hits
+            skipped = sum(1 for article_id in (exclude or ()) if article_id in self._rows)
+            fetch = k + skipped
+            uses_ivf = self._centroids is not None
+            vectors, size, ids = self._snapshot()
+
+        if uses_ivf:
+            # IVF already restricts each query to a few clusters
+            hits = [self._search_one(query, fetch, min_score) for query in queries]
+        else:
+            # The full-corpus matmul runs outside the lock
+            hits = self._search_exact_batch(vectors, size, ids, queries, fetch, min_score)
+
+        if exclude:
+            hits = [[hit for hit in row if hit[0] not in exclude] for row in hits]
+        return [row[:k] for row in hits]
+
+    @staticmethod
+    def _search_exact_batch(
+        vectors: np.ndarray, size: int, ids: List[str], queries: np.ndarray, k: int, min_score: float
+    ) -> List[List[Tuple[str, float]]]:
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, size, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, size)
+            scores = queries @ vectors[start:end].astype(np.float32).T
+
+            keep = min(k, end - start)
+            top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+
+            if best_scores.shape[1] > k:
+                top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        return [
+            [
+                (ids[row], float(score))
+                for row, score in zip(rows, scores)
+                if score > min_score
+            ]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    async def sync(self, force: bool = False):
+        """Pull embeddings stored since the last sync (throttled by sync_interval)"""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+
+        # Serialize syncs so a search arriving during warm-up does not repeat the full load
+        async with self._sync_lock:
+            db = get_database()
+            query = {"embedding": {"$exists": True}}
+            if self._watermark is not None:
+                query["embedded_at"] = {"$gte": self._watermark - SYNC_OVERLAP}
+
+            cursor = db.articles.find(
+                query,
+                {
+                    "_id": 0, "article_id": 1, "embedding": 1, "embedded_at": 1,
+                    "page": 1, "job_id": 1, "created_at": 1
+                }
+            ).sort("embedded_at", 1)
+
+            batch_ids, batch_vectors, batch_metadata = [], [], []
+            async for doc in cursor:
+                batch_ids.append(doc["article_id"])
+                batch_vectors.append(unpack_embedding(doc["embedding"]))
+                batch_metadata.append(doc)
+                self._watermark = doc["embedded_at"]
+
+                if len(batch_ids) >= 10000:
+                    await pipeline_executor.run_threaded(self.add, batch_ids, np.stack(batch_vectors), batch_metadata)
+                    batch_ids, batch_vectors, batch_metadata = [], [], []
+
+            if batch_ids:
+                await pipeline_executor.run_threaded(self.add, batch_ids, np.stack(batch_vectors), batch_metadata)
+
+
+# Global vector index instance
+vector_index = VectorIndex(
+    ivf_threshold=settings.VECTOR_INDEX_IVF_THRESHOLD,
+    nprobe=settings.VECTOR_INDEX_NPROBE,
+    sync_interval=settings.VECTOR_INDEX_SYNC_INTERVAL
+)
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from app.config import settings
+
+
+class WarmupState:
+    """Tracks start-up warm-up of models, remote clients and indexes for /api/ready"""
+
+    def __init__(self):
+        self.components: Dict[str, str] = {}
+        self.started_at = None
+        self.finished_at = None
+        self.ready = False
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "mode": settings.WARMUP_MODE,
+            "components": dict(self.components),
+            "warmup_seconds": (
+                round(self.finished_at - self.started_at, 3)
+                if self.started_at and self.finished_at else None
+            )
+        }
+
+
+def _warmup_steps() -> List[Tuple[str, Callable[[], Awaitable]]]:
+    # Imported here so importing this module stays cheap
+    from app.services.model_registry import get_spacy_model, get_sentence_model
+    from app.services.vector_index import vector_index
+    from app.services.bm25_index import bm25_index
+    from app.services.job_processor import job_processor
+
+    return [
+        ("vector_index", lambda: vector_index.sync(force=True)),
+        ("bm25_index", lambda: bm25_index.sync(force=True)),
+        ("spacy", lambda: asyncio.to_thread(get_spacy_model)),
+        ("sentence_model", lambda: asyncio.to_thread(get_sentence_model)),
+        ("gemini", lambda: asyncio.to_thread(job_processor.gemini_processor.ensure_ready)),
+    ]
+
+
+async def warm_up():
+    """Initialize every deferred component; failures are recorded, not raised"""
+    steps = _warmup_steps()
+    warmup_state.started_at = time.monotonic()
+    for name, _ in steps:
+        warmup_state.components[name] = "pending"
+
+    for name, step in steps:
+        try:
+            await step()
+            warmup_state.components[name] = "ready"
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            warmup_state.components[name] = f"failed: {str(e)[:200]}"
+
+    warmup_state.finished_at = time.monotonic()
+    warmup_state.ready = True
+
+
+def mark_ready_without_warmup():
+    """Lazy mode: nothing is preloaded, components initialize on first use"""
+    warmup_state.components = {"lazy": "initialized on first use"}
+    warmup_state.ready = True
+
+
+# Global warm-up state
+warmup_state = WarmupState()
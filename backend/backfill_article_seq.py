@@ -0,0 +1,43 @@
+"""
+Number the articles of jobs stored before articles had a `seq`
+Usage: python backfill_article_seq.py
+
+GET /api/result pages through articles by `seq`. Jobs completed before that
+field existed are still served, but sorted in memory on every request; this
+gives their articles their position (the article_id suffix) and marks the
+job so the `seq` index serves it.
+"""
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
+
+
+async def main():
+    await connect_to_mongo()
+    db = get_database()
+
+    jobs = 0
+    total = 0
+    async for job in db.jobs.find({"status": "completed", "result.article_seq": {"$ne": True}}, {"job_id": 1}):
+        operations = []
+        async for art in db.articles.find({"job_id": job["job_id"], "seq": {"$exists": False}}, {"article_id": 1}):
+            suffix = art["article_id"].rsplit("_", 1)[-1]
+            if suffix.isdigit():
+                operations.append(UpdateOne({"_id": art["_id"]}, {"$set": {"seq": int(suffix)}}))
+
+        if operations:
+            await db.articles.bulk_write(operations, ordered=False)
+        await db.jobs.update_one({"_id": job["_id"]}, {"$set": {"result.article_seq": True}})
+
+        jobs += 1
+        total += len(operations)
+        print(f"✓ {job['job_id']}: numbered {len(operations)} articles")
+
+    print(f"Done. Numbered {total} articles in {jobs} jobs.")
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""
+Compute search embeddings for articles stored before embeddings were persisted
+Usage: python backfill_embeddings.py
+"""
+import asyncio
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.nlp_processor import NLPProcessor
+from app.services.vector_index import pack_embedding
+
+BATCH_SIZE = 256
+
+
+async def main():
+    await connect_to_mongo()
+    db = get_database()
+    nlp_processor = NLPProcessor()
+
+    total = 0
+    while True:
+        articles = await db.articles.find(
+            {"embedding": {"$exists": False}},
+            {"article_id": 1, "title": 1, "keywords": 1, "content": 1}
+        ).limit(BATCH_SIZE).to_list(length=BATCH_SIZE)
+
+        if not articles:
+            break
+
+        embeddings = nlp_processor.encode_texts(
+            [nlp_processor.article_search_text(article) for article in articles]
+        )
+        embedded_at = datetime.utcnow()
+
+        await db.articles.bulk_write([
+            UpdateOne(
+                {"article_id": article["article_id"]},
+                {"$set": {"embedding": pack_embedding(embedding), "embedded_at": embedded_at}}
+            )
+            for article, embedding in zip(articles, embeddings)
+        ], ordered=False)
+
+        total += len(articles)
+        print(f"✓ Embedded {total} articles")
+
+    print(f"Done. {total} articles backfilled.")
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
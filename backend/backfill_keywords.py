@@ -0,0 +1,59 @@
+"""
+Store normalized keywords for articles saved before keywords_normalized existed,
+and record every article's normalized keywords in keyword_vocabulary (fuzzy lookups)
+Usage: python backfill_keywords.py
+"""
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.keyword_search import normalize_keywords, add_to_vocabulary
+
+BATCH_SIZE = 1000
+
+
+async def main():
+    await connect_to_mongo()
+    db = get_database()
+
+    total = 0
+    while True:
+        articles = await db.articles.find(
+            {"keywords_normalized": {"$exists": False}},
+            {"article_id": 1, "keywords": 1}
+        ).limit(BATCH_SIZE).to_list(length=BATCH_SIZE)
+
+        if not articles:
+            break
+
+        await db.articles.bulk_write([
+            UpdateOne(
+                {"article_id": article["article_id"]},
+                {"$set": {"keywords_normalized": normalize_keywords(article.get("keywords", []))}}
+            )
+            for article in articles
+        ], ordered=False)
+
+        total += len(articles)
+        print(f"✓ Normalized keywords of {total} articles")
+
+    print(f"Done. {total} articles backfilled.")
+
+    # Vocabulary of articles stored before keyword_vocabulary existed (upserts: safe to re-run)
+    keywords = set()
+    recorded = 0
+    async for article in db.articles.find({}, {"_id": 0, "keywords_normalized": 1}):
+        keywords.update(article.get("keywords_normalized", []))
+        if len(keywords) >= BATCH_SIZE:
+            await add_to_vocabulary(db, keywords)
+            recorded += len(keywords)
+            keywords = set()
+    await add_to_vocabulary(db, keywords)
+    recorded += len(keywords)
+    print(f"Done. {recorded} keywords recorded in the vocabulary.")
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
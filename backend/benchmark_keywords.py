@@ -0,0 +1,149 @@
+"""
+Benchmark script for keyword lookups
+Usage: python benchmark_keywords.py [--articles N] [--keep]
+
+Fills a scratch collection (benchmark_keyword_articles, in DATABASE_NAME)
+with N synthetic articles (default 1,000,000) and their keyword vocabulary
+(benchmark_keyword_vocabulary), creates the same keyword indexes as the app,
+and runs explain("executionStats") for the previous
+unanchored case-insensitive regex and for the exact, prefix and fuzzy
+modes of /api/keywords/{keyword}/articles. Reports the winning plan
+stage, keys and documents examined, and execution time.
+Requires MongoDB (MONGODB_URL in .env). The collections are dropped at the end unless --keep.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import settings
+from app.services.keyword_search import keyword_filter, normalize_keywords, add_to_vocabulary
+
+COLLECTION = "benchmark_keyword_articles"
+VOCABULARY = "benchmark_keyword_vocabulary"
+INSERT_BATCH = 10000
+LOOKUP_LIMIT = 20
+
+WORDS = [
+    "budget", "election", "harbor", "school", "market", "weather", "football", "council",
+    "hospital", "railway", "festival", "court", "police", "farmers", "monsoon", "technology",
+    "startup", "cricket", "parliament", "tourism", "airport", "bridge", "museum", "energy",
+]
+ACCENTED = ["Café Culture", "Société Générale", "São Paulo", "Zürich", "Crème Brûlée"]
+RARE_KEYWORDS = 200000
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def rare_keyword(n: int) -> str:
+    """Deterministic pseudo-word: a high-cardinality vocabulary like names and places"""
+    rng = random.Random(n)
+    return "".join(rng.choice(LETTERS) for _ in range(rng.randint(6, 12)))
+
+
+class Scratch:
+    """Stands in for the app database so keyword_filter queries the scratch collections"""
+
+    def __init__(self, collection, vocabulary):
+        self.articles = collection
+        self.keyword_vocabulary = vocabulary
+
+
+def synthetic_keywords(rng: random.Random):
+    keywords = [
+        f"{rng.choice(WORDS)} {rng.choice(WORDS)}" if rng.random() < 0.5 else rng.choice(WORDS)
+        for _ in range(rng.randint(3, 8))
+    ]
+    # A long tail of rare keywords keeps the index selective like real data
+    keywords.append(rare_keyword(rng.randrange(RARE_KEYWORDS)))
+    if rng.random() < 0.01:
+        keywords.append(rng.choice(ACCENTED))
+    return keywords
+
+
+async def populate(scratch: Scratch, count: int):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for offset in range(0, count, INSERT_BATCH):
+        batch = []
+        for i in range(offset, min(offset + INSERT_BATCH, count)):
+            keywords = synthetic_keywords(rng)
+            batch.append({
+                "article_id": f"bench_{i}",
+                "page": 1,
+                "title": f"Synthetic article {i}",
+                "snippet": "Synthetic article used by benchmark_keywords.py.",
+                "keywords": keywords,
+                "keywords_normalized": normalize_keywords(keywords),
+            })
+        await scratch.articles.insert_many(batch, ordered=False)
+        await add_to_vocabulary(scratch, (
+            keyword for article in batch for keyword in article["keywords_normalized"]
+        ))
+        print(f"\r  inserted {offset + len(batch):,}/{count:,}", end="", flush=True)
+    print(f"\n  populated in {time.perf_counter() - start:.1f}s")
+
+    await scratch.articles.create_index("keywords")
+    await scratch.articles.create_index("keywords_normalized")
+    await scratch.keyword_vocabulary.create_index([("prefix", 1), ("length", 1), ("_id", 1)])
+
+
+def winning_stages(plan) -> str:
+    stages = []
+    while plan:
+        stages.append(plan["stage"])
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages)
+
+
+async def explain(collection, label: str, query):
+    explained = await collection.find(query).limit(LOOKUP_LIMIT).explain()
+    stats = explained["executionStats"]
+    print(f"{label}")
+    print(f"  plan:          {winning_stages(explained['queryPlanner']['winningPlan'])}")
+    print(f"  keys examined: {stats['totalKeysExamined']:,}")
+    print(f"  docs examined: {stats['totalDocsExamined']:,}")
+    print(f"  time:          {stats['executionTimeMillis']} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1000000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collection")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    collection = client[settings.DATABASE_NAME][COLLECTION]
+    scratch = Scratch(collection, client[settings.DATABASE_NAME][VOCABULARY])
+
+    if await collection.estimated_document_count() != args.articles:
+        await collection.drop()
+        await scratch.keyword_vocabulary.drop()
+        print(f"Populating {COLLECTION} with {args.articles:,} articles...")
+        await populate(scratch, args.articles)
+    target = rare_keyword(4242)
+    typo = target[:3] + target[4:]  # one character dropped
+
+    # A rare keyword (few matches) shows the cost of a scan; the typo exercises fuzzy mode
+    await explain(collection, f"previous: unanchored case-insensitive regex ('{target.upper()}')", {
+        "keywords": {"$regex": target.upper(), "$options": "i"}
+    })
+    await explain(collection, f"exact ('{target.upper()}')", await keyword_filter(scratch, target.upper(), "exact"))
+    await explain(collection, f"prefix ('{target[:4]}')", await keyword_filter(scratch, target[:4], "prefix"))
+
+    start = time.perf_counter()
+    fuzzy = await keyword_filter(scratch, typo, "fuzzy")
+    print(f"fuzzy candidate lookup ('{typo}' -> {fuzzy['keywords_normalized']['$in']}): "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    await explain(collection, f"fuzzy ('{typo}')", fuzzy)
+    await explain(collection, "exact, accent-folded ('CAFE culture')", await keyword_filter(scratch, "CAFE culture", "exact"))
+
+    if not args.keep:
+        await collection.drop()
+        await scratch.keyword_vocabulary.drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
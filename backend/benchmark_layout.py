@@ -0,0 +1,163 @@
+"""
+Benchmark script for article layout segmentation
+Usage: python benchmark_layout.py [--pages N] [--runs N] [--keep fixture.pdf]
+
+Builds a small multi-column newspaper fixture PDF with known articles
+(a banner story over two columns, stacked stories, a stock listing), then
+compares the "headlines" (full-width bands) and "xycut" (column-aware)
+segmentation strategies of PDFProcessor.segment_page for:
+  - titles found, share of body lines assigned to the right article,
+    mean bbox IoU against the true article region (accuracy)
+  - milliseconds per page (speed)
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.config import settings
+from app.services.pdf_processor import PDFProcessor
+
+PAGE_WIDTH, PAGE_HEIGHT = 792, 1224
+MARGIN, GUTTER = 36, 12
+COLUMNS = 4
+COLUMN_WIDTH = (PAGE_WIDTH - 2 * MARGIN - (COLUMNS - 1) * GUTTER) / COLUMNS
+BODY_SIZE, HEADLINE_SIZE, LINE_GAP = 8, 16, 2.5
+
+
+def column_x(column: int) -> float:
+    return MARGIN + column * (COLUMN_WIDTH + GUTTER)
+
+
+def write_story(page, truth, title, columns, y, lines_per_column, tag):
+    """Headline across `columns`, then body lines flowing down each of them"""
+    x0 = column_x(columns[0])
+    width = column_x(columns[-1]) + COLUMN_WIDTH - x0
+
+    # Shrink the headline until it fits the columns it spans
+    size = HEADLINE_SIZE
+    while fitz.get_text_length(title, "hebo", size) > width:
+        size -= 0.5
+    page.insert_text((x0, y + size), title, fontsize=size, fontname="hebo")
+    region = [x0, y, x0 + fitz.get_text_length(title, "hebo", size), y + size * 1.2]
+
+    lines = []
+    body_top = y + size * 1.2 + 6
+    for column in columns:
+        line_y = body_top
+        for j in range(lines_per_column):
+            text = f"{tag} col{column} line {j:02d} of the story"
+            page.insert_text((column_x(column), line_y + BODY_SIZE), text, fontsize=BODY_SIZE, fontname="helv")
+            lines.append(text)
+            region = [
+                min(region[0], column_x(column)), region[1],
+                max(region[2], column_x(column) + fitz.get_text_length(text, "helv", BODY_SIZE)),
+                max(region[3], line_y + BODY_SIZE * 1.2)
+            ]
+            line_y += BODY_SIZE + LINE_GAP
+
+    truth.append({"title": title, "lines": lines, "bbox": region})
+    return line_y
+
+
+def build_fixture(path: str, pages: int):
+    """Write the fixture PDF and return its ground truth per page"""
+    doc = fitz.open()
+    truth_pages = []
+    for p in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        truth = []
+
+        # Banner story over columns 0-1, then a second story below it in column 0
+        bottom = write_story(page, truth, f"Banner Story About City Budget {p}", [0, 1], 40, 30, f"p{p}a")
+        write_story(page, truth, f"School Board Approves Plan {p}", [0], bottom + 20, 25, f"p{p}b")
+        write_story(page, truth, f"Harbor Bridge Reopens Early {p}", [1], bottom + 20, 25, f"p{p}c")
+
+        # Column 2: three stacked stories
+        y = 40
+        for k in range(3):
+            y = write_story(page, truth, f"Regional Briefing Number {k} {p}", [2], y, 22, f"p{p}d{k}") + 24
+
+        # Column 3: a dense stock listing
+        write_story(page, truth, f"Market Listings And Closing Prices {p}", [3], 40, 90, f"p{p}e")
+
+        truth_pages.append(truth)
+
+    doc.save(path)
+    doc.close()
+    return truth_pages
+
+
+def iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def score(truth, articles):
+    """(titles found, body lines in the right article, mean bbox IoU of found titles)"""
+    by_title = {}
+    for article in articles:
+        for story in truth:
+            if story["title"] in article["title"]:
+                by_title.setdefault(story["title"], article)
+
+    lines_total = lines_right = 0
+    ious = []
+    for story in truth:
+        lines_total += len(story["lines"])
+        article = by_title.get(story["title"])
+        if article is None:
+            continue
+        lines_right += sum(1 for line in story["lines"] if line in article["content"])
+        ious.append(iou(story["bbox"], article["bbox"]))
+
+    return len(by_title), len(truth), lines_right, lines_total, ious
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", help="Also save the fixture PDF to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.keep or os.path.join(tmp, "layout_fixture.pdf")
+        truth_pages = build_fixture(path, args.pages)
+
+        processor = PDFProcessor(path)
+        pages = processor.extract_text()
+        processor.close()
+
+    for strategy in ("headlines", "xycut"):
+        settings.LAYOUT_SEGMENTATION = strategy
+
+        found = titles = right = total = 0
+        ious = []
+        for page, truth in zip(pages, truth_pages):
+            f, t, r, n, page_ious = score(truth, processor.segment_page(page))
+            found, titles, right, total = found + f, titles + t, right + r, total + n
+            ious.extend(page_ious)
+
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            for page in pages:
+                processor.segment_page(page)
+            timings.append((time.perf_counter() - start) / len(pages))
+
+        print(f"{strategy}:")
+        print(f"  titles found:      {found}/{titles}")
+        print(f"  lines assigned:    {right}/{total} ({right / total:.1%})")
+        print(f"  mean bbox IoU:     {statistics.mean(ious) if ious else 0.0:.3f}")
+        print(f"  ms per page:       {statistics.median(timings) * 1000:.2f}")
+
+
+if __name__ == "__main__":
+    main()
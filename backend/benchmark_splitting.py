@@ -0,0 +1,197 @@
+"""
+Benchmark script for headline detection and article splitting
+Usage: python benchmark_splitting.py [path/to/newspaper.pdf] [--spans N] [--headlines N] [--runs N] [--fuzz N]
+
+Compares PDFProcessor.split_into_articles (NumPy span arrays + searchsorted)
+with the previous per-headline scan over every span, on a synthetic dense
+page (classifieds / stock listings) and, if given, on every page of a PDF.
+Both implementations must produce the same articles, which is also checked
+on N randomized pages (default 3000) with spans and headlines bleeding
+past the page edges.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from app.services.pdf_processor import PDFProcessor, span_arrays
+
+
+def legacy_split(page_data):
+    """The previous O(headlines x spans) implementation, kept for comparison"""
+    blocks = page_data["blocks"]
+    font_sizes = [b["size"] for b in blocks if b["size"] > 0]
+    if not font_sizes:
+        return None
+
+    avg_size = np.mean(font_sizes)
+    std_size = np.std(font_sizes)
+    headlines = [
+        {"text": b["text"].strip(), "bbox": b["bbox"]}
+        for b in blocks
+        if (b["size"] > (avg_size + std_size * 0.5) or b["flags"] & 16) and len(b["text"].strip()) > 10
+    ]
+    if not headlines:
+        return None
+    headlines.sort(key=lambda h: h["bbox"][1])
+
+    articles = []
+    for i, headline in enumerate(headlines):
+        y_start = headline["bbox"][1]
+        y_end = headlines[i + 1]["bbox"][1] if i + 1 < len(headlines) else page_data["height"]
+        texts = []
+        x_min, y_min, x_max, y_max = float('inf'), y_start, 0, y_end
+        for block in blocks:
+            if y_start <= block["bbox"][1] < y_end:
+                texts.append(block["text"])
+                x_min = min(x_min, block["bbox"][0])
+                x_max = max(x_max, block["bbox"][2])
+                y_min = min(y_min, block["bbox"][1])
+                y_max = max(y_max, block["bbox"][3])
+        content = " ".join(texts)
+        if len(content.strip()) > 50:
+            articles.append({
+                "page": page_data["page_num"],
+                "title": headline["text"][:200],
+                "content": content,
+                "bbox": [
+                    max(0, x_min - 10), max(0, y_min - 10),
+                    min(page_data["width"], x_max + 10), min(page_data["height"], y_max + 10)
+                ]
+            })
+    return articles
+
+
+def synthetic_page(spans: int, headlines: int, seed: int = 0):
+    """A dense multi-column page: many small body spans, a few large/bold headlines"""
+    rng = random.Random(seed)
+    width, height = 1200.0, 1800.0
+    headline_rows = set(rng.sample(range(spans), headlines))
+
+    blocks = []
+    for i in range(spans):
+        x0 = rng.choice([20.0, 310.0, 600.0, 890.0]) + rng.random() * 5
+        y0 = rng.random() * (height - 20)
+        is_headline = i in headline_rows
+        blocks.append({
+            "text": ("HEADLINE %d MARKET REPORT" % i) if is_headline else "ACME CORP 12.34 +0.56 %d" % i,
+            "bbox": (x0, y0, x0 + 280.0, y0 + (18.0 if is_headline else 8.0)),
+            "size": 18.0 if is_headline else 7.0,
+            "flags": 16 if is_headline else 0,
+            "font": "Helvetica",
+        })
+
+    return {
+        "page_num": 1,
+        "text": "\n".join(block["text"] for block in blocks),
+        "blocks": blocks,
+        "width": width,
+        "height": height
+    }
+
+
+def random_page(rng: random.Random):
+    """A small random page; spans and headlines may lie above or below the page (bleed)"""
+    width, height = rng.choice([(612.0, 792.0), (1200.0, 1800.0)])
+    blocks = []
+    for i in range(rng.randint(1, 60)):
+        is_headline = rng.random() < 0.15
+        x0 = rng.uniform(-20, width)
+        y0 = rng.uniform(-40, height + 80)
+        size = rng.choice([16.0, 20.0, 24.0]) if is_headline else rng.choice([7.0, 8.0, 9.0])
+        blocks.append({
+            "text": (f"Headline number {i} on this page" if is_headline else f"body text line {i} " * rng.randint(1, 4)),
+            "bbox": (x0, y0, x0 + rng.uniform(5, 300), y0 + size),
+            "size": size,
+            "flags": 16 if is_headline and rng.random() < 0.5 else 0,
+            "font": "Helvetica",
+        })
+
+    return {
+        "page_num": 1,
+        "text": "\n".join(block["text"] for block in blocks),
+        "blocks": blocks,
+        "width": width,
+        "height": height
+    }
+
+
+def fuzz_equivalence(processor, pages: int, seed: int = 0):
+    """Compare both implementations on randomized pages; exit on the first difference"""
+    rng = random.Random(seed)
+    for n in range(pages):
+        page = random_page(rng)
+        page["spans"] = span_arrays(page["blocks"])
+        expected = legacy_split(page)
+        if expected is not None and not same_articles(expected, processor.split_into_articles(page)):
+            print(f"❌ Randomized page {n} (seed {seed}) differs from the previous implementation")
+            sys.exit(1)
+    print(f"Randomized pages: {pages} match the previous implementation")
+
+
+def same_articles(expected, actual) -> bool:
+    if len(expected) != len(actual):
+        return False
+    return all(
+        e["title"] == a["title"] and e["content"] == a["content"]
+        and np.allclose(e["bbox"], a["bbox"])
+        for e, a in zip(expected, actual)
+    )
+
+
+def time_runs(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_pages(label: str, pages, processor, runs: int):
+    for page in pages:
+        page["spans"] = span_arrays(page["blocks"])
+        expected = legacy_split(page)
+        if expected is not None and not same_articles(expected, processor.split_into_articles(page)):
+            print(f"❌ {label}: page {page['page_num']} differs from the previous implementation")
+            sys.exit(1)
+
+    span_count = sum(len(page["blocks"]) for page in pages)
+    legacy = time_runs(lambda: [legacy_split(page) for page in pages], runs)
+    vectorized = time_runs(lambda: [processor.split_into_articles(page) for page in pages], runs)
+    print(f"{label}: {len(pages)} page(s), {span_count} spans")
+    print(f"  previous:   {legacy * 1000:9.2f} ms")
+    print(f"  vectorized: {vectorized * 1000:9.2f} ms  ({legacy / vectorized:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--spans", type=int, default=5000)
+    parser.add_argument("--headlines", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fuzz", type=int, default=3000, help="Randomized pages checked for equal output")
+    args = parser.parse_args()
+
+    processor = PDFProcessor.__new__(PDFProcessor)  # splitting needs no open document
+    fuzz_equivalence(processor, args.fuzz)
+    benchmark_pages(
+        "Synthetic dense page",
+        [synthetic_page(args.spans, args.headlines)],
+        processor, args.runs
+    )
+
+    if args.pdf:
+        pdf_processor = PDFProcessor(args.pdf)
+        pages = pdf_processor.extract_text()
+        pdf_processor.close()
+        benchmark_pages(args.pdf, pages, processor, args.runs)
+
+    print("✓ Outputs match the previous implementation")
+
+
+if __name__ == "__main__":
+    main()
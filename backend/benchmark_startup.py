@@ -0,0 +1,83 @@
+"""
+Benchmark script for API cold start
+Usage: python benchmark_startup.py [--mode eager|background|lazy] [--runs N]
+
+Measures, in fresh processes: the time to import the app, the time until
+/api/health answers (server accepting traffic) and the time until /api/ready
+reports ready (warm-up finished). Requires MongoDB like the server itself.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_import() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def wait_for(url: str, start: float, timeout: float, expect_status: int = 200) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == expect_status:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def time_server(mode: str, timeout: float):
+    port = free_port()
+    env = dict(os.environ, WARMUP_MODE=mode)
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        healthy = wait_for(f"http://127.0.0.1:{port}/api/health", start, timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/api/ready", start, timeout)
+        return healthy, ready
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", default="background", choices=["eager", "background", "lazy"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    imports, healthy, ready = [], [], []
+    for run in range(args.runs):
+        imports.append(time_import())
+        h, r = time_server(args.mode, args.timeout)
+        healthy.append(h)
+        ready.append(r)
+        print(f"Run {run + 1}: import={imports[-1]:.2f}s  health={h:.2f}s  ready={r:.2f}s")
+
+    print(f"\nWARMUP_MODE={args.mode} (median of {args.runs} runs)")
+    print(f"  App import:        {statistics.median(imports):.2f}s")
+    print(f"  /api/health up:    {statistics.median(healthy):.2f}s")
+    print(f"  /api/ready ready:  {statistics.median(ready):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
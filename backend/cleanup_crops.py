@@ -0,0 +1,52 @@
+"""
+Delete crop images that no article references any more
+Usage: python cleanup_crops.py [--min-age-hours H] [--dry-run]
+
+Crops are content-addressed and may be shared between articles, so deleting
+articles (e.g. the leftovers of a re-processed job) leaves their crops in the
+crop store. This removes crops no article references. Crops stored (or stored
+again) within the last H hours (default 24) are kept, so the crops of jobs
+still being processed are never removed.
+"""
+import argparse
+import asyncio
+import time
+
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.crop_store import crop_store
+
+BATCH_SIZE = 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-age-hours", type=float, default=24.0)
+    parser.add_argument("--dry-run", action="store_true", help="Only count unreferenced crops")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    db = get_database()
+
+    image_ids = await crop_store.list_ids(time.time() - args.min_age_hours * 3600)
+    print(f"Checking {len(image_ids)} crops stored more than {args.min_age_hours:g}h ago...")
+
+    removed = 0
+    for start in range(0, len(image_ids), BATCH_SIZE):
+        batch = image_ids[start:start + BATCH_SIZE]
+        referenced = {
+            doc["crop_image_id"]
+            async for doc in db.articles.find({"crop_image_id": {"$in": batch}}, {"_id": 0, "crop_image_id": 1})
+        }
+
+        for image_id in batch:
+            if image_id not in referenced:
+                if not args.dry_run:
+                    await crop_store.delete(image_id)
+                removed += 1
+
+    print(f"Done. {removed} unreferenced crops {'found' if args.dry_run else 'removed'}.")
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
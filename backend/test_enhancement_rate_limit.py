@@ -0,0 +1,118 @@
+"""
+Test script for the AI enhancement rate limit
+Usage: python test_enhancement_rate_limit.py [requests_per_minute]
+
+Drives JobProcessor.request_enhancements with a local stub model (no API
+key or network needed) that answers batch prompts for only the first
+article and rejects every article's first single-article call with a 429.
+Checks that:
+  - every provider call, including the per-article retries, took a token
+    (calls never outrun the bucket's capacity + rate * elapsed)
+  - a 429 on a retry does not discard the batch results already received
+  - every article ends up with an AI result
+Exits with status 1 if any check fails.
+"""
+import asyncio
+import json
+import re
+import sys
+import time
+
+from app.config import settings
+from app.services import job_processor as job_processor_module
+from app.services.enhancement_scheduler import EnhancementScheduler
+from app.services.gemini_processor import GeminiProcessor
+
+ARTICLES = 6
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class PartialBatchModel:
+    """Answers batch prompts for the first article only; 429s each article's first single call"""
+
+    def __init__(self):
+        self.calls = []
+        self.rejected = set()
+
+    def generate_content(self, prompt: str):
+        self.calls.append(time.monotonic())
+
+        batch = re.search(r"Articles \(JSON\):\n(\[.*?\])\n", prompt, re.DOTALL)
+        if batch:
+            first = json.loads(batch.group(1))[0]
+            return StubResponse(json.dumps([{
+                "index": first["index"],
+                "title": "Headline From The Batch Reply",
+                "summary": "Batch summary.",
+                "keywords": ["batch"]
+            }]))
+
+        if prompt not in self.rejected:
+            self.rejected.add(prompt)
+            raise Exception("429 Resource has been exhausted (e.g. check quota).")
+
+        return StubResponse(json.dumps({
+            "title": "Headline From A Single Reply",
+            "summary": "Single summary.",
+            "keywords": ["single"]
+        }))
+
+
+async def main(requests_per_minute: float) -> bool:
+    model = PartialBatchModel()
+    scheduler = EnhancementScheduler(
+        max_concurrency=4,
+        requests_per_minute=requests_per_minute,
+        max_retries=5,
+        backoff_base=0.5,
+        backoff_max=2.0
+    )
+    job_processor_module.enhancement_scheduler = scheduler
+
+    processor = job_processor_module.JobProcessor()
+    processor.gemini_processor = GeminiProcessor(model=model)
+
+    articles = [
+        {"title": f"Story {i}", "content": f"Article number {i} about the city council budget. " * 5}
+        for i in range(ARTICLES)
+    ]
+
+    start = time.monotonic()
+    results = await processor.request_enhancements("rate-limit-test", articles)
+    elapsed = time.monotonic() - start
+
+    bucket = scheduler.bucket
+    ok = True
+
+    # Tokens available by the time of each call: the initial burst plus the refill since
+    for count, called_at in enumerate(model.calls, 1):
+        allowed = bucket.capacity + (called_at - start) * bucket.rate
+        if count > allowed + 1e-6:
+            print(f"❌ Call {count} at {called_at - start:.2f}s exceeded the bucket ({allowed:.2f} tokens)")
+            ok = False
+
+    if results[0] is None or results[0]["title"] != "Headline From The Batch Reply":
+        print("❌ The batch result was lost")
+        ok = False
+
+    missing = [i for i, result in enumerate(results) if result is None or result.get("fallback")]
+    if missing:
+        print(f"❌ No AI result for articles {missing}")
+        ok = False
+
+    print(f"Provider calls: {len(model.calls)} in {elapsed:.1f}s "
+          f"(bucket: {requests_per_minute:g} rpm, burst {bucket.capacity:g}); "
+          f"rate-limit retries: {scheduler.retries}")
+    if ok:
+        print("✓ Every provider call was rate limited and the batch results were kept")
+    return ok
+
+
+if __name__ == "__main__":
+    rpm = float(sys.argv[1]) if len(sys.argv) > 1 else 60.0
+    settings.GEMINI_ASYNC = True
+    sys.exit(0 if asyncio.run(main(rpm)) else 1)
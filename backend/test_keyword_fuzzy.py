@@ -0,0 +1,123 @@
+"""
+Test script for fuzzy keyword lookups
+Usage: python test_keyword_fuzzy.py
+
+Drives keyword_filter(mode="fuzzy") against an in-memory stand-in for the
+keyword_vocabulary collection (no MongoDB needed), with more near
+neighbours of "council" (one edit away, same length, sorting before it)
+than FUZZY_CANDIDATE_LIMIT. Checks that:
+  - the exact keyword is always in the filter, even when the candidate
+    limit cuts it from the keywords read
+  - at most FUZZY_CANDIDATE_LIMIT candidates are read per lookup
+  - the same query always gives the same filter
+  - a typo still finds the keyword while the candidates fit the limit
+Exits with status 1 if any check fails.
+"""
+import asyncio
+import string
+import sys
+
+from app.services import keyword_search
+from app.services.keyword_search import add_to_vocabulary, keyword_filter
+
+CANDIDATE_LIMIT = 10
+
+
+class StubCursor:
+    def __init__(self, docs, vocabulary):
+        self.docs = docs
+        self.vocabulary = vocabulary
+
+    def sort(self, field, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    def __aiter__(self):
+        self.vocabulary.read += len(self.docs)
+        self.iterator = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class StubVocabulary:
+    """keyword_vocabulary: upserts of {_id, prefix, length} and equality finds"""
+
+    def __init__(self):
+        self.docs = {}
+        self.read = 0
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            keyword = operation._filter["_id"]
+            if keyword not in self.docs:
+                self.docs[keyword] = {"_id": keyword, **operation._doc["$setOnInsert"]}
+
+    def find(self, query, projection=None):
+        docs = [
+            {"_id": doc["_id"]} for doc in self.docs.values()
+            if all(doc[field] == value for field, value in query.items())
+        ]
+        return StubCursor(docs, self)
+
+
+class StubDatabase:
+    def __init__(self):
+        self.keyword_vocabulary = StubVocabulary()
+
+
+def near_neighbours():
+    """councia ... councik: one edit from "council" and read before it"""
+    return ["counci" + letter for letter in string.ascii_lowercase if letter < "l"]
+
+
+async def lookup(db, keyword):
+    db.keyword_vocabulary.read = 0
+    query = await keyword_filter(db, keyword, "fuzzy")
+    return query["keywords_normalized"]["$in"], db.keyword_vocabulary.read
+
+
+async def main() -> bool:
+    keyword_search.FUZZY_CANDIDATE_LIMIT = CANDIDATE_LIMIT
+    ok = True
+
+    db = StubDatabase()
+    await add_to_vocabulary(db, ["council", "councils", "counsel"])
+
+    matches, _ = await lookup(db, "Councl")
+    if "council" not in matches:
+        print(f"❌ Typo 'councl' did not find 'council': {matches}")
+        ok = False
+
+    await add_to_vocabulary(db, near_neighbours())
+
+    matches, read = await lookup(db, "COUNCIL")
+    if "council" not in matches:
+        print(f"❌ Exact keyword dropped once candidates exceed the limit: {matches}")
+        ok = False
+    if read > CANDIDATE_LIMIT:
+        print(f"❌ Read {read} candidates, limit is {CANDIDATE_LIMIT}")
+        ok = False
+
+    again, _ = await lookup(db, "COUNCIL")
+    if again != matches:
+        print(f"❌ Same query, different filter: {matches} vs {again}")
+        ok = False
+
+    print(f"Vocabulary: {len(db.keyword_vocabulary.docs)} keywords, candidate limit {CANDIDATE_LIMIT}; "
+          f"'COUNCIL' read {read} candidates and matches {len(matches)} keywords")
+    if ok:
+        print("✓ The exact keyword always matches and candidate reads stay bounded and deterministic")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,98 @@
+"""
+Test script to measure /api/status latency while a PDF is being ingested
+Usage: python test_status_latency.py path/to/newspaper.pdf [max_p95_ms]
+
+Requires MongoDB (MONGODB_URL in .env). The ingest runs in the same event
+loop as the API, so a blocked loop shows up directly as status latency.
+Fails (exit status 1) when the p95 latency during ingest exceeds
+max_p95_ms (default 100).
+"""
+import asyncio
+import shutil
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+from app.config import settings
+from app.main import app
+from app.models.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.job_processor import process_pdf_background
+from app.services.job_queue import job_queue
+
+
+async def poll_status(client: httpx.AsyncClient, job_id: str, until_done: bool, samples: int = 20):
+    """Poll the status endpoint and return the observed latencies in ms"""
+    latencies = []
+    while True:
+        start = time.perf_counter()
+        response = await client.get(f"/api/status/{job_id}")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        status = response.json().get("status")
+        if until_done and status in ("completed", "failed"):
+            return latencies, status
+        if not until_done and len(latencies) >= samples:
+            return latencies, status
+
+        await asyncio.sleep(0.05)
+
+
+DEFAULT_MAX_P95_MS = 100.0
+
+
+def report(label: str, latencies) -> float:
+    """Print latency percentiles and return the p95"""
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(f"{label:<18} n={len(latencies):<5} "
+          f"p50={statistics.median(latencies):8.1f}ms  p95={p95:8.1f}ms  max={latencies[-1]:8.1f}ms")
+    return p95
+
+
+async def main(pdf_path: str, max_p95_ms: float) -> bool:
+    await connect_to_mongo()
+    db = get_database()
+
+    job_id = str(uuid.uuid4())
+    file_path = f"{settings.UPLOAD_DIR}/{job_id}.pdf"
+    shutil.copy(pdf_path, file_path)
+
+    await job_queue.enqueue(job_id, file_path)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        idle, _ = await poll_status(client, job_id, until_done=False)
+
+        ingest = asyncio.create_task(process_pdf_background(job_id, file_path))
+        busy, status = await poll_status(client, job_id, until_done=True)
+        await ingest
+
+    print(f"\nIngest finished with status: {status}\n")
+    report("Idle", idle)
+    busy_p95 = report("During ingest", busy)
+
+    await db.articles.delete_many({"job_id": job_id})
+    await db.jobs.delete_one({"job_id": job_id})
+    await close_mongo_connection()
+
+    if status != "completed":
+        print("❌ Ingest did not complete")
+        return False
+    if busy_p95 > max_p95_ms:
+        print(f"❌ p95 status latency during ingest {busy_p95:.1f}ms exceeds {max_p95_ms:.1f}ms")
+        return False
+
+    print(f"✓ p95 status latency during ingest is within {max_p95_ms:.1f}ms")
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python test_status_latency.py path/to/newspaper.pdf [max_p95_ms]")
+        sys.exit(1)
+
+    max_p95 = float(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_MAX_P95_MS
+    sys.exit(0 if asyncio.run(main(sys.argv[1], max_p95)) else 1)
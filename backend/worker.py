@@ -0,0 +1,40 @@
+"""
+Standalone ingest worker: claims queued PDF jobs and processes them
+Usage: python worker.py [concurrency]
+
+Run with USE_JOB_QUEUE=true on the API so uploads are only enqueued.
+Scale ingest by running more worker processes, independently of the API.
+"""
+import asyncio
+import signal
+import sys
+
+from app.config import settings
+from app.models.database import connect_to_mongo, close_mongo_connection
+from app.services.job_queue import job_queue, JobWorker
+from app.services.pipeline_executor import pipeline_executor
+
+
+async def main(concurrency: int):
+    await connect_to_mongo()
+
+    worker = JobWorker(
+        job_queue,
+        concurrency=concurrency,
+        poll_interval=settings.WORKER_POLL_INTERVAL
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        pipeline_executor.shutdown()
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else settings.WORKER_CONCURRENCY
+    asyncio.run(main(concurrency))
@@ -2,6 +2,7 @@ import { motion } from "framer-motion";
 import { Eye } from "lucide-react";
 import type { Article } from "../types";
 import { cn } from "../lib/utils";
+import { resolveApiUrl } from "../lib/api";
 
 interface ArticleCardProps {
   article: Article;
@@ -23,10 +24,10 @@ export function ArticleCard({ article, onKeywordClick, onArticleClick, index }:
       className="group bg-card rounded-xl shadow-card hover:shadow-lifted transition-all duration-300 overflow-hidden cursor-pointer border border-border"
     >
       {/* Thumbnail */}
-      {article.crop_image_base64 && (
+      {article.crop_image_url && (
         <div className="relative aspect-video overflow-hidden bg-neutral-100">
           <img
-            src={`data:image/jpeg;base64,${article.crop_image_base64}`}
+            src={resolveApiUrl(article.crop_image_url)}
             alt={article.title}
             className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
           />
@@ -6,6 +6,7 @@ import {
   DialogBody,
 } from "./ui/dialog";
 import type { Article } from "../types";
+import { resolveApiUrl } from "../lib/api";
 
 interface ArticleDetailModalProps {
   isOpen: boolean;
@@ -36,10 +37,10 @@ export function ArticleDetailModal({
 
         <DialogBody className="max-h-[75vh] space-y-6">
           {/* Cropped Image - Full Width */}
-          {article.crop_image_base64 && (
+          {article.crop_image_url && (
             <div className="bg-white rounded-lg overflow-hidden shadow-sm border border-neutral-200">
               <img
-                src={`data:image/jpeg;base64,${article.crop_image_base64}`}
+                src={resolveApiUrl(article.crop_image_url)}
                 alt={article.title}
                 className="w-full h-auto"
               />
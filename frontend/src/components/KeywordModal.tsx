@@ -9,6 +9,7 @@ import {
 import { KeywordChip } from "./KeywordChip";
 import { ChevronDown, ChevronUp } from "lucide-react";
 import type { Article } from "../types";
+import { resolveApiUrl } from "../lib/api";
 
 interface KeywordModalProps {
   isOpen: boolean;
@@ -101,10 +102,10 @@ export function KeywordModal({
                   {isExpanded && (
                     <div className="border-t border-neutral-200 p-6 space-y-6 animate-fade-in bg-neutral-50">
                       {/* Cropped Image - Large and Prominent */}
-                      {article.crop_image_base64 && (
+                      {article.crop_image_url && (
                         <div className="bg-white rounded-lg overflow-hidden shadow-sm">
                           <img
-                            src={`data:image/jpeg;base64,${article.crop_image_base64}`}
+                            src={resolveApiUrl(article.crop_image_url)}
                             alt={article.title}
                             className="w-full h-auto"
                           />
@@ -28,9 +28,23 @@ export const getJobStatus = async (jobId: string): Promise<JobStatus> => {
   return response.data;
 };
 
+// Results are paginated: follow next_cursor until every article is loaded
 export const getJobResult = async (jobId: string): Promise<ProcessResult> => {
   const response = await api.get<ProcessResult>(`/result/${jobId}`);
-  return response.data;
+  const result = response.data;
+  let cursor = result.next_cursor;
+
+  while (cursor) {
+    const page = await api.get<ProcessResult>(`/result/${jobId}`, { params: { cursor } });
+    result.articles.push(...page.data.articles);
+    cursor = page.data.next_cursor;
+  }
+
+  return { ...result, next_cursor: null };
 };
 
+// Resolve an API-relative path (e.g. an article's crop_image_url) to a full URL
+export const resolveApiUrl = (path: string): string =>
+  new URL(path, API_BASE_URL).toString();
+
 export default api;
@@ -7,8 +7,9 @@ export interface Article {
   content: string;
   keywords: string[];
   hashtags: string[];
-  crop_image_base64: string;
+  crop_image_url: string;
   related_articles: string[];
+  related_scores?: number[];
   created_at?: string;
 }
 
@@ -20,8 +21,10 @@ export interface KeywordSummary {
 export interface ProcessResult {
   job_id: string;
   pages: number;
+  article_count?: number;
   articles: Article[];
   keywords_summary: KeywordSummary[];
+  next_cursor?: string | null;
 }
 
 export interface JobStatus {